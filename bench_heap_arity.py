@@ -0,0 +1,50 @@
+"""Benchmark add and remove_min of DaryHeapPriorityQueue for several arities d and key distributions.
+Usage: python bench_heap_arity.py [n]
+For each distribution, n items are added one at a time, then removed with remove_min;
+times are in microseconds per operation. Larger d means fewer levels, so add gets
+cheaper, while remove_min compares up to d children per level: the best d for a
+mixed workload is where the two curves cross, and is reported per distribution
+as the d with the lowest total."""
+import sys
+from random import random, randrange
+from time import perf_counter
+from libs.priority_queue import HeapPriorityQueue, DaryHeapPriorityQueue
+
+ARITIES = (2, 3, 4, 8, 16)
+
+def distributions(n):
+	"""Return dictionary from distribution name to list of n keys"""
+	return {
+		'uniform': [random() for _ in range(n)],
+		'ascending': list(range(n)), #Every add stops at once
+		'descending': list(range(n, 0, -1)), #Every add climbs to the root
+		'few distinct': [randrange(16) for _ in range(n)],
+	}
+
+def bench(make, keys):
+	"""Return (add, remove_min) microseconds per operation for a queue built by make()"""
+	q = make()
+	start = perf_counter()
+	for k in keys:
+		q.add(k, None)
+	middle = perf_counter()
+	for _ in range(len(keys)):
+		q.remove_min()
+	end = perf_counter()
+	return ((middle - start) * 1e6 / len(keys), (end - middle) * 1e6 / len(keys))
+
+if __name__ == "__main__":
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+	print('n =', n)
+	for name, keys in distributions(n).items():
+		print('\n' + name)
+		print('%-8s %10s %12s %10s' % ('heap', 'add us', 'remove us', 'total us'))
+		add, remove = bench(HeapPriorityQueue, keys)
+		print('%-8s %10.3f %12.3f %10.3f' % ('binary', add, remove, add + remove))
+		results = {} #d -> (add, remove_min, total)
+		for d in ARITIES:
+			add, remove = bench(lambda: DaryHeapPriorityQueue(d = d), keys)
+			results[d] = (add, remove, add + remove)
+			print('%-8s %10.3f %12.3f %10.3f' % ('d=%d' % d, add, remove, add + remove))
+		best = [min(results, key = lambda d: results[d][i]) for i in range(3)]
+		print('best d: add=%d remove_min=%d total=%d' % tuple(best))
@@ -0,0 +1,216 @@
+#Bounded cache maps: hash map index + positional list eviction order
+from functools import wraps
+from libs.maps import MapBase, ProbeHashMap
+from libs.positional_list import PositionalList
+
+class CacheMapBase(MapBase):
+	"""Abstract base class for bounded maps that evict entries according to a policy.
+	A hash map (index) maps each key to the Position of its item in the eviction
+	order, so hits, insertions and evictions all take O(1) expected time.
+	Concrete subclasses implement _add, _touch, _remove and _victim."""
+
+	#-----------------------------Nested Item class-----------------------------------
+	class _Item(MapBase._Item):
+		"""Cache entry: key-value pair with its weight (and access count for LFU)"""
+		__slots__ = '_weight', '_count', '_bucket'
+
+		def __init__(self, k, v, weight):
+			super().__init__(k, v)
+			self._weight = weight
+			self._count = 1 #Number of accesses (insertion included)
+			self._bucket = None #Position of frequency bucket (LFU only)
+
+	#-----------------------------------Public Methods--------------------------------
+	def __init__(self, max_entries = None, max_weight = None, weigh = None, on_evict = None, index_type = ProbeHashMap):
+		"""Create an empty cache.
+		Parameters.
+		max_entries: int. Maximum number of entries (None for no limit)
+		max_weight: number. Maximum total weight of entries (None for no limit)
+		weigh: function (k, v) -> number. Weight of an entry (1 if not given)
+		on_evict: function (k, v). Called on every entry evicted to respect the limits
+		index_type: HashMapBase subclass used as index from keys to positions
+		"""
+		if max_entries is None and max_weight is None:
+			raise ValueError("A cache needs max_entries or max_weight")
+		self._index = index_type()
+		self._max_entries = max_entries
+		self._max_weight = max_weight
+		self._weigh = weigh
+		self._on_evict = on_evict
+		self._weight = 0 #Total weight of entries
+		self._hits = 0
+		self._misses = 0
+		self._evictions = 0
+
+	def __len__(self):
+		"""Return number of cached entries"""
+		return len(self._index)
+
+	def __iter__(self):
+		"""Iterate over cached keys (in no particular order)"""
+		return iter(self._index)
+
+	def __contains__(self, k):
+		"""Return True if k is cached; does not count as an access"""
+		return k in self._index
+
+	def __getitem__(self, k):
+		"""Return value cached for key k, counting a hit (raise KeyError and count a miss if absent)"""
+		try:
+			p = self._index[k]
+		except KeyError:
+			self._misses += 1
+			raise
+		self._hits += 1
+		p = self._touch(p)
+		self._index[k] = p
+		return p.element()._value
+
+	def __setitem__(self, k, v):
+		"""Cache value v for key k, then evict entries until limits are respected.
+		An entry heavier than max_weight is not cached (and replaces no other entry, nor
+		calls on_evict): a previous value of k is removed, so lookups of k miss."""
+		weight = self._weigh(k, v) if self._weigh is not None else 1
+		if self._max_weight is not None and weight > self._max_weight:
+			if k in self._index:
+				del self[k] #Stale value must not survive the assignment
+			return
+		try:
+			p = self._index[k]
+		except KeyError:
+			self._evict(1, weight) #Make room first: the newcomer must not be its own victim
+			self._index[k] = self._add(self._Item(k, v, weight))
+		else:
+			item = p.element()
+			self._weight -= item._weight
+			item._value = v
+			item._weight = weight
+			self._index[k] = self._touch(p)
+		self._weight += weight
+		self._evict()
+
+	def __delitem__(self, k):
+		"""Remove entry with key k (raise KeyError if not found); not counted as eviction"""
+		p = self._index[k]
+		del self._index[k]
+		self._weight -= self._remove(p)._weight
+
+	def get_or_compute(self, k, fn):
+		"""Return value cached for key k; on a miss compute it as fn(k) and cache it"""
+		try:
+			return self[k]
+		except KeyError:
+			v = fn(k)
+			self[k] = v
+			return v
+
+	def memoize(self, fn):
+		"""Decorator caching results of fn in this map, keyed by the tuple of positional arguments"""
+		@wraps(fn)
+		def wrapper(*args):
+			return self.get_or_compute(args, lambda key: fn(*key))
+		return wrapper
+
+	def stats(self):
+		"""Return dictionary with hit, miss and eviction counters, size and weight"""
+		return {'hits': self._hits, 'misses': self._misses, 'evictions': self._evictions,
+				'entries': len(self), 'weight': self._weight}
+
+	#---------------------------------Nonpublic Utilities-----------------------------
+	def _evict(self, entries = 0, weight = 0):
+		"""Evict entries chosen by the policy while a limit is exceeded,
+		or would be after adding the given number of entries and weight"""
+		while len(self) > 0 and ((self._max_entries is not None and len(self) + entries > self._max_entries) or
+				(self._max_weight is not None and self._weight + weight > self._max_weight)):
+			item = self._remove(self._victim())
+			del self._index[item._key]
+			self._weight -= item._weight
+			self._evictions += 1
+			if self._on_evict is not None:
+				self._on_evict(item._key, item._value)
+
+	def _add(self, item):
+		"""Insert new item in the eviction order and return its Position"""
+		raise NotImplementedError("must be implemented by subclass")
+
+	def _touch(self, p):
+		"""Record an access to the item at Position p and return its (new) Position"""
+		raise NotImplementedError("must be implemented by subclass")
+
+	def _remove(self, p):
+		"""Delete Position p from the eviction order and return its item"""
+		raise NotImplementedError("must be implemented by subclass")
+
+	def _victim(self):
+		"""Return Position of the next item to evict"""
+		raise NotImplementedError("must be implemented by subclass")
+
+
+class LRUCacheMap(CacheMapBase):
+	"""Cache evicting the Least Recently Used entry.
+	Items are kept in a PositionalList from most to least recently used."""
+	def __init__(self, *args, **kwargs):
+		"""Create an empty cache (see CacheMapBase for parameters)"""
+		super().__init__(*args, **kwargs)
+		self._order = PositionalList()
+
+	def _add(self, item):
+		return self._order.add_first(item)
+
+	def _touch(self, p):
+		return self._order.add_first(self._order.delete(p)) #Move to front
+
+	def _remove(self, p):
+		return self._order.delete(p)
+
+	def _victim(self):
+		return self._order.last()
+
+
+class LFUCacheMap(CacheMapBase):
+	"""Cache evicting the Least Frequently Used entry (least recently used among ties).
+	Items with the same access count share a bucket, a PositionalList from most to least
+	recently used; buckets are in turn kept in a PositionalList by increasing count,
+	so that a hit moves an item to the next bucket in O(1) time."""
+
+	class _Bucket:
+		"""Items with the same access count"""
+		__slots__ = '_count', '_items'
+
+		def __init__(self, count):
+			self._count = count
+			self._items = PositionalList()
+
+	def __init__(self, *args, **kwargs):
+		"""Create an empty cache (see CacheMapBase for parameters)"""
+		super().__init__(*args, **kwargs)
+		self._buckets = PositionalList()
+
+	def _add(self, item):
+		first = self._buckets.first()
+		if first is None or first.element()._count != 1:
+			first = self._buckets.add_first(self._Bucket(1))
+		item._count = 1
+		item._bucket = first
+		return first.element()._items.add_first(item)
+
+	def _touch(self, p):
+		item = p.element()
+		bucket = item._bucket
+		nxt = self._buckets.after(bucket)
+		if nxt is None or nxt.element()._count != item._count + 1:
+			nxt = self._buckets.add_after(self._Bucket(item._count + 1), bucket)
+		self._remove(p)
+		item._count += 1
+		item._bucket = nxt
+		return nxt.element()._items.add_first(item)
+
+	def _remove(self, p):
+		bucket = p.element()._bucket
+		item = bucket.element()._items.delete(p)
+		if bucket.element()._items.is_empty():
+			self._buckets.delete(bucket) #Drop emptied bucket
+		return item
+
+	def _victim(self):
+		return self._buckets.first().element()._items.last()
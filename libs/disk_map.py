@@ -0,0 +1,263 @@
+#Persistent hash map stored in a memory-mapped file
+import os
+import mmap
+import struct
+from hashlib import blake2b
+from random import randrange
+from libs.maps import HashMapBase, _load_columns
+
+class DiskHashMap(HashMapBase):
+	"""Hash Table with Open Addressing and Linear Probing stored in a memory-mapped file.
+	Keys and values are bytes objects of bounded length, kept in fixed-size records:
+	opening a map only reads its header, and the OS pages in the records actually
+	probed. Hash codes come from an unkeyed blake2b digest, stable across processes,
+	and the MAD parameters are saved in the header, so every process finds each key
+	at the same slot. Several processes may open the same file read-only; a writer
+	grows the map by rehashing into a new file that atomically replaces the old one
+	(readers keep the version they opened).
+
+	File layout: a header, then capacity records of the form
+	state (1 byte), key length (2), value length (2), hash code (8), key, value."""
+
+	_HEADER = struct.Struct('<8sQQQQQQII') #magic, capacity, n, deleted, prime, scale, shift, key_size, value_size
+	_COUNTS = struct.Struct('<QQ') #n, deleted: the header fields updated by every insertion and deletion
+	_COUNTS_OFFSET = 16 #After magic and capacity
+	_RECORD = struct.Struct('<BHHQ') #state, key length, value length, hash code
+	_MAGIC = b'DSKHMAP1'
+	_FREE = 0 #Slot states
+	_OCCUPIED = 1
+	_DELETED = 2
+
+	def __init__(self, path, key_size = 32, value_size = 64, cap = 11, p = 109345121, readonly = False):
+		"""Open the map stored at path, creating it if missing.
+		Parameters.
+		path: str. File name
+		key_size: int. Maximum length of a key (new maps only)
+		value_size: int. Maximum length of a value (new maps only)
+		cap: int. Initial capacity (new maps only)
+		p: int. Prime number used in MAD (new maps only)
+		readonly: bool. Map file read-only (shared by many processes)
+		"""
+		if not os.path.exists(path):
+			if readonly:
+				raise FileNotFoundError(path)
+			self._create(path, key_size, value_size, cap, p)
+		self._path = path
+		self._readonly = readonly
+		self._old = None #Resizes are never incremental here
+		self._resizes = 0 #Counted per open map, not saved in the file
+		self._resize_time = 0.0
+		self._migrate_time = 0.0
+		self._open()
+		self._min_capacity = min(cap, self._capacity)
+
+	#---------------------------------Nonpublic Methods---------------------------------
+	@classmethod
+	def _create(cls, path, key_size, value_size, cap, p):
+		"""Write an empty map file (records are zeroed, i.e. free, and sparse on most systems)"""
+		record_size = cls._RECORD.size + key_size + value_size
+		with open(path, 'wb') as f:
+			f.write(cls._HEADER.pack(cls._MAGIC, cap, 0, 0, p, 1 + randrange(p - 1), randrange(p), key_size, value_size))
+			f.truncate(cls._HEADER.size + cap * record_size)
+
+	def _open(self):
+		"""Map file at self._path and load its header"""
+		self._file = open(self._path, 'rb' if self._readonly else 'r+b')
+		self._mm = mmap.mmap(self._file.fileno(), 0, access = mmap.ACCESS_READ if self._readonly else mmap.ACCESS_WRITE)
+		(magic, self._capacity, self._n, self._deleted, self._prime, self._scale, self._shift,
+			self._key_size, self._value_size) = self._HEADER.unpack_from(self._mm, 0)
+		if magic != self._MAGIC:
+			self._mm.close()
+			self._file.close()
+			raise ValueError('Not a DiskHashMap file: ' + repr(self._path))
+		self._record_size = self._RECORD.size + self._key_size + self._value_size
+
+	def _check_writable(self):
+		if self._readonly:
+			raise PermissionError('Map opened read-only')
+
+	def _write_counts(self):
+		"""Store n and deleted in the mapped header, so it always agrees with the records"""
+		self._COUNTS.pack_into(self._mm, self._COUNTS_OFFSET, self._n, self._deleted)
+
+	def _hash_code(self, k):
+		"""Return 64-bit hash code of bytes k, identical in every process"""
+		if not isinstance(k, (bytes, bytearray)):
+			raise TypeError('Keys must be bytes')
+		return int.from_bytes(blake2b(k, digest_size = 8).digest(), 'little')
+
+	def _compress(self, h):
+		"""MAD compression of hash code h to a slot index"""
+		return (h*self._scale + self._shift) % self._prime % self._capacity
+
+	def _offset(self, j):
+		"""Return file offset of record j"""
+		return self._HEADER.size + j * self._record_size
+
+	def _find_slot(self, k, h):
+		"""Search for key k having hash code h.
+		Return (success, index) tuple as ProbeHashMap._find_slot does."""
+		mm = self._mm
+		unpack = self._RECORD.unpack_from
+		start = self._RECORD.size
+		j = self._compress(h)
+		first_avail = None
+		while True:
+			off = self._offset(j)
+			state, klen, vlen, code = unpack(mm, off)
+			if state == DiskHashMap._OCCUPIED:
+				if code == h and mm[off + start:off + start + klen] == k:
+					return (True, j)
+			else:
+				if first_avail is None:
+					first_avail = j
+				if state == DiskHashMap._FREE:
+					return (False, first_avail)
+			j = (j + 1) % self._capacity #Keep looking cyclically
+
+	def _write(self, j, k, v, h):
+		"""Store record j for key k, value v and hash code h"""
+		off = self._offset(j)
+		start = off + self._RECORD.size
+		self._RECORD.pack_into(self._mm, off, DiskHashMap._OCCUPIED, len(k), len(v), h)
+		self._mm[start:start + len(k)] = k
+		self._mm[start + self._key_size:start + self._key_size + len(v)] = v
+
+	def _resize_table(self, c):
+		"""Rehash all entries into a new file of capacity c, which then replaces the current one"""
+		self._check_writable()
+		tmp = self._path + '.resize'
+		if os.path.exists(tmp):
+			os.remove(tmp) #Leftover of an interrupted resize
+		new = DiskHashMap(tmp, self._key_size, self._value_size, c, self._prime)
+		start = self._RECORD.size
+		for j in range(self._capacity):
+			off = self._offset(j)
+			state, klen, vlen, h = self._RECORD.unpack_from(self._mm, off)
+			if state == DiskHashMap._OCCUPIED: #Keys are distinct: only look for a free slot, reuse hash code
+				s = new._compress(h)
+				while new._mm[new._offset(s)] != DiskHashMap._FREE:
+					s = (s + 1) % c
+				new._mm[new._offset(s):new._offset(s) + self._record_size] = self._mm[off:off + self._record_size]
+		new._n = self._n
+		new._write_counts()
+		new.close()
+		self.close()
+		os.replace(tmp, self._path) #Atomic: readers see either the old or the new file
+		self._open()
+
+	def _table_size(self):
+		return self._capacity
+
+	def _probe_lengths(self):
+		for j in range(self._capacity):
+			state, klen, vlen, h = self._RECORD.unpack_from(self._mm, self._offset(j))
+			if state == DiskHashMap._OCCUPIED:
+				yield (j - self._compress(h)) % self._capacity + 1
+
+	#----------------------------------Public Methods-----------------------------------
+	def __len__(self):
+		"""Return number of stored entries"""
+		return self._n
+
+	def __getitem__(self, k):
+		"""Return value (bytes) associated with key k (raise KeyError if not found)"""
+		if not isinstance(k, (bytes, bytearray)):
+			raise KeyError('Key Error ' + repr(k)) #Cannot be stored, so not present: 'a' in m is False
+		found, s = self._find_slot(k, self._hash_code(k))
+		if not found:
+			raise KeyError('Key Error ' + repr(k))
+		off = self._offset(s)
+		vlen = self._RECORD.unpack_from(self._mm, off)[2]
+		start = off + self._RECORD.size + self._key_size
+		return self._mm[start:start + vlen]
+
+	def __setitem__(self, k, v):
+		"""Assign value v (bytes) to key k (bytes), overwriting existing value if present"""
+		self._check_writable()
+		h = self._hash_code(k)
+		if not isinstance(v, (bytes, bytearray)):
+			raise TypeError('Values must be bytes')
+		k, v = bytes(k), bytes(v) #Validate everything before any state changes
+		if len(k) > self._key_size or len(v) > self._value_size:
+			raise ValueError('Key or value too long for this map')
+		found, s = self._find_slot(k, h)
+		if found:
+			self._write(s, k, v, h)
+		else:
+			if self._mm[self._offset(s)] == DiskHashMap._DELETED:
+				self._deleted -= 1 #Marker reused
+			self._n += 1
+			self._write(s, k, v, h)
+			self._write_counts()
+		if self._n + self._deleted > self._capacity // 2: #Keep load factor <= 1/2 (deletion markers included)
+			self._resize(2 * self._capacity - 1 if self._n > self._capacity // 4 else self._capacity)
+
+	def __delitem__(self, k):
+		"""Remove item associated with key k (raise KeyError if not found)"""
+		self._check_writable()
+		found, s = self._find_slot(k, self._hash_code(k))
+		if not found:
+			raise KeyError('Key Error ' + repr(k))
+		self._mm[self._offset(s)] = DiskHashMap._DELETED
+		self._n -= 1
+		self._deleted += 1
+		self._write_counts()
+
+	def __iter__(self):
+		"""Iterate over keys (bytes) stored in map"""
+		start = self._RECORD.size
+		for j in range(self._capacity):
+			off = self._offset(j)
+			state, klen, vlen, h = self._RECORD.unpack_from(self._mm, off)
+			if state == DiskHashMap._OCCUPIED:
+				yield self._mm[off + start:off + start + klen]
+
+	def get_many(self, keys, default = None):
+		"""Return list with the value of each key in keys (default for missing ones)"""
+		return [self.get(k, default) for k in keys]
+
+	def set_many(self, pairs):
+		"""Assign each (k, v) pair of pairs"""
+		for (k, v) in pairs:
+			self[k] = v
+
+	def delete_many(self, keys):
+		"""Remove every key of keys present in map; return number of removed keys"""
+		removed = 0
+		for k in keys:
+			if k in self:
+				del self[k]
+				removed += 1
+		return removed
+
+	@classmethod
+	def load(cls, fileobj, path, key_size = 32, value_size = 64):
+		"""Create a map at path (which must not exist) with the entries written by dump() to
+		fileobj, sizing its file for all of them at once. Keys and values must be bytes."""
+		if os.path.exists(path):
+			raise FileExistsError(path)
+		keys, values, is_sorted = _load_columns(fileobj)
+		result = cls(path, key_size, value_size, max(11, 2 * len(keys) + 1)) #Load factor <= 1/2: no resize
+		for (k, v) in zip(keys, values):
+			result[k] = v
+		return result
+
+	def flush(self):
+		"""Write all modified pages, header included, to disk"""
+		if not self._readonly:
+			self._mm.flush()
+
+	def close(self):
+		"""Flush (if writable) and unmap the file"""
+		if self._mm is not None:
+			self.flush()
+			self._mm.close()
+			self._file.close()
+			self._mm = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
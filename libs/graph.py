@@ -1,3 +1,5 @@
+from libs.priority_queue import AdaptableHeapPriorityQueue
+
 class Graph:
 	"""Simple Graph implemented using an adjacency map"""
 
@@ -153,4 +155,45 @@ def DFS_complete(g):
 		if u not in forest:
 			forest[u] = None
 			DFS(g, u, forest)
-	return forest
\ No newline at end of file
+	return forest
+
+def shortest_path_lengths(g, src):
+	"""Compute shortest-path distances from src to reachable vertices of g (Dijkstra).
+	Graph g can be undirected or directed, but must be weighted such that
+	e.element() returns a nonnegative numeric weight for each edge e.
+	Vertices enter the adaptable priority queue when first reached, and an
+	improved distance updates their entry in place instead of adding a new one.
+	Return dictionary mapping each reachable vertex to its distance from src."""
+	d = {src: 0} #d[v] is upper bound from src to v
+	cloud = {} #map reachable v to its d[v] value
+	pq = AdaptableHeapPriorityQueue() #vertex v will have key d[v]
+	pqlocator = {src: pq.add(0, src)} #map from vertex to its pq locator
+	while not pq.is_empty():
+		key, u = pq.remove_min()
+		cloud[u] = key #its correct d[u] value
+		del pqlocator[u] #u is no longer in pq
+		for e in g.incident_edges(u): #outgoing edges (u,v)
+			v = e.opposite(u)
+			if v not in cloud:
+				wgt = e.element()
+				if v not in pqlocator: #first time v is reached
+					d[v] = d[u] + wgt
+					pqlocator[v] = pq.add(d[v], v)
+				elif d[u] + wgt < d[v]: #better path to v?
+					d[v] = d[u] + wgt #update the distance
+					pq.update(pqlocator[v], d[v], v) #update the pq entry
+	return cloud #only includes reachable vertices
+
+def shortest_path_tree(g, s, d):
+	"""Reconstruct shortest-path tree rooted at vertex s, given distance map d.
+	Return tree as a map from each reachable vertex v (other than s) to the
+	edge e=(u,v) that is used to reach v from its parent u in the tree."""
+	tree = {}
+	for v in d:
+		if v is not s:
+			for e in g.incident_edges(v, False): #consider INCOMING edges
+				u = e.opposite(v)
+				wgt = e.element()
+				if u in d and d[v] == d[u] + wgt:
+					tree[v] = e #edge e is used to reach v
+	return tree
@@ -0,0 +1,173 @@
+#Hash map for integer keys stored in NumPy arrays (requires numpy)
+import sys
+from operator import index
+import numpy as np
+from libs.maps import HashMapBase
+
+class IntHashMap(HashMapBase):
+	"""Hash Table with Open Addressing and Linear Probing for 64-bit integer keys.
+	Keys, values and slot states live in three NumPy arrays instead of _Item
+	objects; self._table is the array of slot states, so HashMapBase's load
+	factor bookkeeping applies unchanged. Values have a fixed dtype.
+	lookup() resolves a whole array of keys at once, computing the MAD
+	compression and every probe step vectorised. Resizes happen at once."""
+
+	_FREE = 0 #Slot states
+	_OCCUPIED = 1
+	_DELETED = 2
+	_MODULUS = sys.hash_info.modulus #Python's hash of an int is its residue modulo this prime
+	_KEY_MIN = -2**63 #Range of int64 keys
+	_KEY_MAX = 2**63 - 1
+
+	def __init__(self, cap = 11, p = 109345121, value_dtype = np.int64):
+		"""Create an empty hash-table map.
+		Parameters.
+		cap: int. Initial capacity of the arrays
+		p: int. Prime number used in MAD.
+		value_dtype: NumPy dtype of stored values
+		"""
+		super().__init__(cap, p)
+		self._value_dtype = value_dtype
+		self._allocate(cap)
+
+	#---------------------------------Nonpublic Methods---------------------------------
+	def _allocate(self, c):
+		"""Install empty arrays with capacity c"""
+		self._table = np.zeros(c, dtype = np.uint8) #All slots _FREE
+		self._keys = np.zeros(c, dtype = np.int64)
+		self._values = np.zeros(c, dtype = self._value_dtype)
+
+	def _convert(self, k, v):
+		"""Return (k, v) converted to the dtypes of the arrays.
+		Raise TypeError, OverflowError or ValueError before any state changes if they do not fit."""
+		k = index(k) #Rejects 1.5, whose hash differs from that of the int it would be stored as
+		if not IntHashMap._KEY_MIN <= k <= IntHashMap._KEY_MAX:
+			raise OverflowError('Key out of int64 range ' + repr(k))
+		if self._values.dtype != object:
+			v = np.asarray(v, dtype = self._values.dtype)
+			if v.ndim != 0:
+				raise ValueError('Value must be a scalar ' + repr(v))
+		return (k, v)
+
+	def _hash_array(self, keys):
+		"""Return array with hash(k) for each k of int64 array keys (Python's numeric hash)"""
+		m = self._MODULUS
+		r = np.remainder(keys, m) #In [0, m) also for negative keys
+		h = np.where(keys >= 0, r, -np.remainder(m - r, m)) #hash(-n) == -hash(n)
+		h[h == -1] = -2 #-1 is reserved as an error code
+		return h
+
+	def _compress_array(self, h):
+		"""Vectorised MAD compression of hash codes h (agrees with _compress)"""
+		p = self._prime
+		return (np.remainder(h, p) * self._scale + self._shift) % p % len(self._table) #Reduce first: no overflow
+
+	def _find_slot(self, j, k):
+		"""Search for key k starting at bucket j.
+		Return (success, index) tuple as ProbeHashMap._find_slot does."""
+		state = self._table
+		keys = self._keys
+		c = len(state)
+		first_avail = None
+		while True:
+			s = state[j]
+			if s == IntHashMap._OCCUPIED:
+				if keys[j] == k:
+					return (True, j)
+			else:
+				if first_avail is None:
+					first_avail = j
+				if s == IntHashMap._FREE:
+					return (False, first_avail)
+			j = (j + 1) % c #Keep looking cyclically
+
+	def _bucket_getitem(self, j, k, h):
+		found, s = self._find_slot(j, k)
+		if not found:
+			raise KeyError('Key Error ' + repr(k))
+		return self._values[s].item() if self._values.dtype != object else self._values[s]
+
+	def _bucket_setitem(self, j, k, v, h):
+		found, s = self._find_slot(j, k)
+		if not found:
+			if self._table[s] == IntHashMap._DELETED:
+				self._deleted -= 1 #Marker reused
+			self._table[s] = IntHashMap._OCCUPIED
+			self._keys[s] = k
+			self._n += 1
+		self._values[s] = v
+
+	def _bucket_delitem(self, j, k, h):
+		found, s = self._find_slot(j, k)
+		if not found:
+			raise KeyError('Key Error ' + repr(k))
+		self._table[s] = IntHashMap._DELETED
+		self._deleted += 1
+
+	def _place(self, keys, values):
+		"""Store distinct keys absent from the map with their values, probing all of them in lockstep"""
+		state = self._table
+		c = len(state)
+		pos = self._compress_array(self._hash_array(keys))
+		pending = np.arange(len(keys))
+		while pending.size:
+			slots = pos[pending]
+			free = state[slots] == IntHashMap._FREE
+			slots_free, first = np.unique(slots[free], return_index = True) #One winner per free slot
+			winners = pending[free][first]
+			state[slots_free] = IntHashMap._OCCUPIED
+			self._keys[slots_free] = keys[winners]
+			self._values[slots_free] = values[winners]
+			lost = np.ones(len(pending), dtype = bool)
+			lost[np.flatnonzero(free)[first]] = False
+			pending = pending[lost] #Everybody else moves on to the next slot
+			pos[pending] = (pos[pending] + 1) % c
+
+	def _resize_table(self, c):
+		"""Resize arrays to capacity c at once, reinserting entries vectorised"""
+		live = self._table == IntHashMap._OCCUPIED
+		keys = self._keys[live]
+		values = self._values[live]
+		self._allocate(c)
+		self._deleted = 0
+		self._place(keys, values)
+
+	def _probe_lengths(self):
+		live = np.flatnonzero(self._table == IntHashMap._OCCUPIED)
+		home = self._compress_array(self._hash_array(self._keys[live]))
+		return ((live - home) % len(self._table) + 1).tolist()
+
+	#----------------------------------Public Methods-----------------------------------
+	def __setitem__(self, k, v):
+		k, v = self._convert(k, v)
+		super().__setitem__(k, v)
+
+	def set_many(self, pairs):
+		"""Assign each (k, v) pair of pairs, converting all of them before storing any"""
+		super().set_many([self._convert(k, v) for (k, v) in pairs])
+
+	def __iter__(self):
+		for k in self._keys[self._table == IntHashMap._OCCUPIED].tolist():
+			yield k
+
+	def lookup(self, keys):
+		"""Look up an array of keys at once.
+		Return (values, found) pair of arrays: found[i] tells whether keys[i] is in the map,
+		in which case values[i] is its value (else values[i] is zero)."""
+		keys = np.asarray(keys, dtype = np.int64)
+		values = np.zeros(len(keys), dtype = self._values.dtype)
+		found = np.zeros(len(keys), dtype = bool)
+		state = self._table
+		c = len(state)
+		pos = self._compress_array(self._hash_array(keys))
+		pending = np.arange(len(keys)) #Probes not resolved yet
+		while pending.size:
+			slots = pos[pending]
+			s = state[slots]
+			hit = (s == IntHashMap._OCCUPIED) & (self._keys[slots] == keys[pending])
+			found[pending[hit]] = True
+			values[pending[hit]] = self._values[slots[hit]]
+			going = ~hit & (s != IntHashMap._FREE) #A free slot ends an unsuccessful search
+			pending = pending[going]
+			pos[pending] = (slots[going] + 1) % c
+		return (values, found)
@@ -1,15 +1,64 @@
-from collections.abc import MutableMapping
-from random import randrange
+from collections.abc import Mapping, MutableMapping
+from random import randrange, choice, random
+from copy import copy
+from bisect import bisect_left, bisect_right
+from operator import attrgetter
+from threading import RLock
+from heapq import merge
+from time import perf_counter
+from array import array
+import pickle
+import struct
+import io
+
+_item_key = attrgetter('_key') #Key extractor for bisect over tables of _Item
+
+#Dump format: header, then a keys column and a values column, each one a length-prefixed pickled list
+_DUMP_HEADER = struct.Struct('<8sBQ') #magic, sorted flag, number of entries
+_DUMP_MAGIC = b'MAPDUMP1'
+_DUMP_LENGTH = struct.Struct('<Q') #byte length of a column
+_DUMP_GLOBALS = frozenset(['complex', 'bytearray', 'set', 'frozenset']) #Only builtins a column may reference
+
+class _ColumnUnpickler(pickle.Unpickler):
+	"""Unpickler accepting plain values only: numbers, strings, bytes, None and containers
+	of them. Any other class or function raises UnpicklingError instead of being loaded,
+	so a dump from an untrusted source cannot run code."""
+	def find_class(self, module, name):
+		if module == 'builtins' and name in _DUMP_GLOBALS:
+			return super().find_class(module, name)
+		raise pickle.UnpicklingError('Map dumps may only hold plain values, not ' + module + '.' + name)
+
+def _dump_columns(fileobj, keys, values, is_sorted):
+	"""Write lists keys and values to binary file fileobj in dump format"""
+	fileobj.write(_DUMP_HEADER.pack(_DUMP_MAGIC, is_sorted, len(keys)))
+	for column in (keys, values):
+		data = pickle.dumps(column, pickle.HIGHEST_PROTOCOL) #One pickle per column, not per item
+		fileobj.write(_DUMP_LENGTH.pack(len(data)))
+		fileobj.write(data)
+
+def _load_columns(fileobj):
+	"""Read a dump from binary file fileobj; return (keys, values, is_sorted) tuple"""
+	magic, is_sorted, n = _DUMP_HEADER.unpack(fileobj.read(_DUMP_HEADER.size))
+	if magic != _DUMP_MAGIC:
+		raise ValueError('Not a map dump')
+	columns = []
+	for _ in range(2):
+		(length,) = _DUMP_LENGTH.unpack(fileobj.read(_DUMP_LENGTH.size))
+		columns.append(_ColumnUnpickler(io.BytesIO(fileobj.read(length))).load())
+	if len(columns[0]) != n or len(columns[1]) != n:
+		raise ValueError('Truncated or corrupt map dump')
+	return (columns[0], columns[1], bool(is_sorted))
 
 class MapBase(MutableMapping):
 	"""My own ABC which contains a nonpublic nested _Item class"""
 	class _Item:
 		"""Lightweight composite to store key-value pairs as map items"""
-		__slots__ = '_key', '_value' #Optimize memory usage
+		__slots__ = '_key', '_value', '_hash' #Optimize memory usage
 
-		def __init__(self, k, v):
+		def __init__(self, k, v, h = None):
 			self._key = k
 			self._value = v
+			self._hash = h #Full hash code of k, cached by hash-based maps
 
 		def __eq__(self, other):
 			return self._key == other._key #Compare items based on their keys
@@ -20,6 +69,40 @@ class MapBase(MutableMapping):
 		def __lt__(self, other):
 			return self._key < other._key
 
+class MapSnapshot(Mapping):
+	"""Read-only view of a map frozen at the time snapshot() was called.
+	It shares storage with the live map, whose writes copy shared parts first,
+	so the view never changes. Besides the Mapping methods, it offers the
+	non-mutating methods of the underlying map (find_range, rank, dump, ...)."""
+
+	_READ_METHODS = frozenset(['get_many', 'get_all', 'pairs', 'stats', 'dump', 'find_min', 'find_max', 'find_ge', 'find_gt',
+		'find_lt', 'find_range', 'rank', 'select', 'count_range', 'items_range', 'union', 'intersection',
+		'difference', 'merge_join'])
+
+	def __init__(self, frozen):
+		"""Wrap frozen, a shallow copy of the map that nothing will modify"""
+		self._map = frozen
+
+	def __getitem__(self, k):
+		return self._map[k]
+
+	def __len__(self):
+		return len(self._map)
+
+	def __iter__(self):
+		return iter(self._map)
+
+	def __contains__(self, k):
+		return k in self._map
+
+	def __reversed__(self):
+		return reversed(self._map)
+
+	def __getattr__(self, name):
+		if name in MapSnapshot._READ_METHODS:
+			return getattr(self._map, name)
+		raise AttributeError(name)
+
 class UnsortedTableMap(MapBase):
 	"""(Naive) Map implementation using unsorted list.
 	All core methods run in O(n) time."""
@@ -27,6 +110,16 @@ class UnsortedTableMap(MapBase):
 		"""Create empty map"""
 		self._table = [] 
 
+	def _find_index(self, k, h = None):
+		"""Return index of item with key k, or -1 if not found.
+		When the hash code h of k is given, cached hash codes are compared before keys."""
+		table = self._table
+		for j in range(len(table)):
+			item = table[j]
+			if (h is None or item._hash == h) and item._key == k:
+				return j
+		return -1
+
 	def __len__(self):
 		"""Return number of stored entries"""
 		return len(self._table)
@@ -56,85 +149,439 @@ class UnsortedTableMap(MapBase):
 		for item in self._table:
 			if item._key == k: #match found
 				item._value = v #assign new value
+				return
 		#If no match found
 		self._table.append(self._Item(k, v))
 
 class HashMapBase(MapBase):
 	"""Abstract base class for hash-based maps using MAD compression.
-	Relies on concrete _bucket_getitem, _bucket_setitem and _bucket_delitem"""
-	def __init__(self, cap = 11, p = 109345121):
+	Relies on concrete _bucket_getitem, _bucket_setitem, _bucket_delitem and _bucket_drain.
+	Bucket methods receive the full hash code h of the key, which items cache.
+
+	In incremental mode a resize does not rebuild the table at once: the old table is
+	kept aside (as a map of the same type) and every set or delete migrates at most
+	REHASH_STEP of its buckets into the new table, as in Redis' dict. Lookups search
+	both tables but do not migrate, so iterating over items() stays safe.
+
+	The table shrinks by half when the load factor falls below MIN_LOAD, and compact()
+	rebuilds it at the smallest comfortable capacity on demand."""
+
+	REHASH_STEP = 4 #Buckets migrated per operation during an incremental resize
+	MIN_LOAD = 1 / 8 #Shrink table when load factor falls below this value
+
+	def __init__(self, cap = 11, p = 109345121, incremental = False):
 		"""Create an empty hash-table map.
 		Parameters.
 		cap: int. Initial capacity of the bucket array
 		p: int. Prime number used in MAD.
+		incremental: bool. Spread resizes over subsequent operations
 		"""
-		self._table = cap * [None] #Initialize empty table
+		self._table = self._empty_table(cap) #Initialize empty table
 		self._prime = p
 		self._n = 0 #Number of stored entries
+		self._deleted = 0 #Slots holding deletion markers (open addressing only)
+		self._min_capacity = cap #Table never shrinks below initial capacity
 		self._scale = 1 + randrange(p - 1) #scale from 1 to p-1 for MAD
 		self._shift = randrange(p) #shift from 0 to p-1 for MAD
+		self._incremental = incremental
+		self._old = None #Map holding the table being drained (incremental resize only)
+		self._rehash_index = 0 #Next bucket of the old table to migrate
+		self._resizes = 0 #Number of resizes (for stats)
+		self._resize_time = 0.0 #Seconds spent resizing (for stats)
+		self._migrate_time = 0.0 #Seconds spent in incremental migration steps (for stats)
 
 	def __len__(self):
 		"""Return number of stored entries"""
+		return self._entries()
+
+	def _entries(self):
+		"""Return number of items stored in the table(s), on which resizing decisions are based"""
+		old = self._old #Read once: a concurrent _finish_rehash may clear it
+		if old is not None:
+			return self._n + old._n #Entries not migrated yet
 		return self._n
 
 	def __getitem__(self, k):
-		j = self._hash_function(k)
-		return self._bucket_getitem(j, k)
+		h = hash(k) #Computed once, then cached in the stored item
+		try:
+			return self._bucket_getitem(self._compress(h), k, h)
+		except KeyError:
+			if self._old is None:
+				raise
+			return self._old._bucket_getitem(self._old._compress(h), k, h) #Might raise KeyError
 
 	def __delitem__(self, k):
 		"""Remove but do not return element stored at key k"""
-		j = self._hash_function(k)
-		self._bucket_delitem(j, k) #Delete item - might raise KeyError
-		self._n -= 1 #Decrease size
+		if self._old is not None:
+			self._rehash_step()
+		h = hash(k)
+		try:
+			self._bucket_delitem(self._compress(h), k, h) #Delete item - might raise KeyError
+			self._n -= 1 #Decrease size
+		except KeyError:
+			if self._old is None:
+				raise
+			self._old._bucket_delitem(self._old._compress(h), k, h)
+			self._old._n -= 1
+		self._shrink_if_sparse()
 
 	def __setitem__(self, k, v):
-		j = self._hash_function(k)
-		self._bucket_setitem(j, k, v) #Store new item - subroutine mantains self._n
-		if self._n > len(self._table) // 2: #Keep load factor <2
-			self._resize(2 * len(self._table) - 1) 
+		h = hash(k)
+		if self._old is not None:
+			self._rehash_step()
+			if self._old is not None:
+				try:
+					self._old._bucket_delitem(self._old._compress(h), k, h) #Key moves to the new table
+					self._old._n -= 1
+				except KeyError:
+					pass
+		self._bucket_setitem(self._compress(h), k, v, h) #Store new item - subroutine mantains self._n
+		self._grow_if_full()
+
+	def _grow_if_full(self):
+		"""Resize after an insertion if the table is more than half full"""
+		if self._entries() + self._deleted > len(self._table) // 2: #Keep load factor <2 (deletion markers included)
+			if self._entries() > len(self._table) // 4:
+				self._resize(2 * len(self._table) - 1)
+			else:
+				self._resize(len(self._table)) #Mostly markers: rehash in place to purge them
+
+	def _shrink_if_sparse(self):
+		"""Halve the table after a deletion if load factor fell below MIN_LOAD"""
+		if self._entries() < len(self._table) * self.MIN_LOAD and len(self._table) > self._min_capacity:
+			self._resize(max(self._min_capacity, (len(self._table) + 1) // 2)) #Inverse of growth
+
+	#-------------------------------Batch Operations-------------------------------
+	def get_many(self, keys, default = None):
+		"""Return list with the value of each key in keys (default for missing ones)"""
+		keys = list(keys)
+		hashes = [hash(k) for k in keys] #Whole batch hashed up front
+		compress = self._compress #Local aliases keep the loop tight
+		getitem = self._bucket_getitem
+		result = []
+		append = result.append
+		for (k, h) in zip(keys, hashes):
+			try:
+				append(getitem(compress(h), k, h))
+			except KeyError:
+				append(default if self._old is None else self.get(k, default)) #Maybe not migrated yet
+		return result
+
+	def set_many(self, pairs):
+		"""Assign each (k, v) pair of pairs, resizing at most once for the whole batch"""
+		pairs = list(pairs)
+		hashes = [hash(k) for (k, v) in pairs]
+		self._reserve(len(pairs))
+		compress = self._compress
+		setitem = self._bucket_setitem
+		for ((k, v), h) in zip(pairs, hashes):
+			setitem(compress(h), k, v, h) #Subroutine mantains self._n
+
+	def _reserve(self, count):
+		"""Complete any pending resize, then resize at most once so that count more items
+		fit without further growth"""
+		self._finish_rehash()
+		bound = self._entries() + count #Final size if all keys are new
+		if bound + self._deleted > len(self._table) // 2:
+			c = len(self._table)
+			while bound > c // 2:
+				c = 2 * c - 1 #Same capacities as one-by-one growth
+			self._resize(c)
+			self._finish_rehash()
+
+	def delete_many(self, keys):
+		"""Remove every key of keys present in map, shrinking at most once for the whole batch.
+		Return number of removed keys (missing keys are ignored)."""
+		keys = list(keys)
+		hashes = [hash(k) for k in keys]
+		self._finish_rehash()
+		compress = self._compress
+		delitem = self._bucket_delitem
+		removed = 0
+		for (k, h) in zip(keys, hashes):
+			try:
+				delitem(compress(h), k, h)
+				removed += 1
+			except KeyError:
+				pass
+		self._n -= removed
+		c = len(self._table)
+		while self._entries() < c * self.MIN_LOAD and c > self._min_capacity:
+			c = max(self._min_capacity, (c + 1) // 2)
+		if c != len(self._table):
+			self._resize(c)
+			self._finish_rehash()
+		return removed
+
+	def dump(self, fileobj):
+		"""Write all entries to binary file fileobj as a key column and a value column.
+		Neither buckets nor MAD parameters are saved: load() lays the table out anew.
+		load() accepts plain keys and values only (numbers, strings, bytes, tuples, ...)."""
+		keys = list(self)
+		_dump_columns(fileobj, keys, self.get_many(keys), False)
 
+	@classmethod
+	def load(cls, fileobj):
+		"""Return a new map with the entries written by dump() (of any map class) to fileobj.
+		The table is sized for all entries in one step, before any insertion.
+		Columns are unpickled without loading any class or function, so a file from another
+		host cannot run code; instances of other classes raise pickle.UnpicklingError."""
+		keys, values, is_sorted = _load_columns(fileobj)
+		result = cls()
+		result.set_many(zip(keys, values)) #Resizes once, then never again
+		return result
 
-	def _hash_function(self, k):
-		"""Nonpublic hash wrapper"""
-		return (hash(k)*self._scale + self._shift) % self._prime % len(self._table) #Notice len(self._table) == N with theory notation
+	def compact(self):
+		"""Rebuild the table at the smallest capacity keeping load factor around 1/3,
+		dropping deletion markers and completing any pending incremental resize."""
+		self._finish_rehash()
+		self._resize(max(self._min_capacity, 3 * self._entries()))
+		self._finish_rehash()
+
+	def _empty_table(self, c):
+		"""Return an empty bucket array of capacity c"""
+		return c * [None]
+
+	def _compress(self, h):
+		"""MAD compression of hash code h to a bucket index"""
+		return (h*self._scale + self._shift) % self._prime % len(self._table) #Notice len(self._table) == N with theory notation
 
 	def _resize(self, c):
-		"""Resize table (array) to capacity c"""
-		old = list(self.items()) #Use iterations to store old values
-		self._table = c * [None] #Create new table
-		self._n = 0 #Reinitialize length value
-		for (k, v) in old:
-			self[k] = v #Reload items
+		"""Resize table (array) to capacity c, counting resizes and time spent for stats().
+		Concrete maps customise _resize_table, not this method."""
+		start = perf_counter()
+		migrated = self._migrate_time
+		self._resize_table(c)
+		self._migrate_time = migrated #Migration done within the resize counts as resize time
+		self._resizes += 1
+		self._resize_time += perf_counter() - start
+
+	def _resize_table(self, c):
+		"""Resize table (array) to capacity c.
+		Items are moved with their cached hash codes, so no key is hashed again."""
+		self._start_rehash(c)
+		if not self._incremental:
+			self._finish_rehash()
+
+	#-----------------------------Instrumentation-------------------------------
+	def _table_size(self):
+		"""Return number of buckets (slots) of the table"""
+		return len(self._table)
+
+	def _probe_lengths(self):
+		"""Generate, for each entry of the (new) table, the number of buckets
+		or chain positions a successful search for it inspects"""
+		raise NotImplementedError("must be implemented by subclass")
+
+	def stats(self):
+		"""Return dictionary with a snapshot of table statistics.
+		Only resize count and the time spent resizing and migrating are tracked as
+		operations run; everything else is computed here by scanning the table, in
+		O(capacity) time, so maps cost nothing extra until stats() is called. During an incremental resize, only the new
+		table is scanned."""
+		histogram = {} #Probe length -> number of entries
+		for length in self._probe_lengths():
+			histogram[length] = histogram.get(length, 0) + 1
+		entries = sum(histogram.values())
+		size = self._table_size()
+		return {
+			'entries': self._entries(),
+			'capacity': size,
+			'load_factor': self._entries() / size,
+			'tombstone_ratio': self._deleted / size,
+			'probe_histogram': dict(sorted(histogram.items())),
+			'probe_mean': sum(l * c for (l, c) in histogram.items()) / entries if entries else 0.0,
+			'probe_max': max(histogram, default = 0),
+			'collision_rate': 1 - histogram.get(1, 0) / entries if entries else 0.0, #Entries not in first bucket tried
+			'resizes': self._resizes,
+			'resize_time': self._resize_time, #Seconds spent in _resize
+			'migrate_time': self._migrate_time, #Seconds spent migrating buckets after _resize returned (incremental mode)
+			'rehashing': self._old is not None,
+		}
+
+	def _start_rehash(self, c):
+		"""Begin a resize towards capacity c, keeping the old table aside"""
+		self._finish_rehash() #At most one resize in progress
+		old = copy(self) #Shares scale and shift, so old keys are found where they were
+		old._incremental = False
+		self._old = old
+		self._rehash_index = 0
+		self._table = self._empty_table(c)
+		self._n = 0
+		self._deleted = 0
+
+	def _rehash_step(self, steps = None):
+		"""Migrate the next buckets of the old table (REHASH_STEP by default), timing it for stats()"""
+		start = perf_counter()
+		old = self._old
+		stop = min(len(old._table), self._rehash_index + (steps or self.REHASH_STEP))
+		for i in range(self._rehash_index, stop):
+			for item in old._bucket_drain(i):
+				old._n -= 1
+				h = item._hash
+				self._bucket_setitem(self._compress(h), item._key, item._value, h) #Key cannot be present in new table
+		self._rehash_index = stop
+		if stop == len(old._table):
+			self._old = None #Resize complete
+		self._migrate_time += perf_counter() - start
+
+	def _finish_rehash(self):
+		"""Complete a pending incremental resize, if any"""
+		if self._old is not None:
+			self._rehash_step(len(self._old._table))
+
+class _PagedTable:
+	"""Bucket array split into pages of PAGE_SIZE slots, each stamped with the snapshot
+	version current when it was created. Supports len(), indexing and iteration like a
+	list; writers go through writable_page(), which copies a page shared with a snapshot."""
+	__slots__ = '_pages', '_versions', '_size'
+
+	PAGE_BITS = 6
+	PAGE_SIZE = 1 << PAGE_BITS #64 slots per page
+	PAGE_MASK = PAGE_SIZE - 1
+
+	def __init__(self, c, version):
+		"""Create c empty slots, in pages stamped with version"""
+		self._pages = [min(self.PAGE_SIZE, c - i) * [None] for i in range(0, c, self.PAGE_SIZE)]
+		self._versions = len(self._pages) * [version]
+		self._size = c
+
+	def __len__(self):
+		return self._size
+
+	def __getitem__(self, j):
+		return self._pages[j >> self.PAGE_BITS][j & self.PAGE_MASK]
+
+	def __iter__(self):
+		for page in self._pages:
+			yield from page
+
+	def copy(self):
+		"""Return a table sharing all pages with this one, in O(capacity / PAGE_SIZE) time"""
+		other = _PagedTable(0, None)
+		other._pages = list(self._pages)
+		other._versions = list(self._versions)
+		other._size = self._size
+		return other
+
+	def writable_page(self, j, version):
+		"""Return the page holding slot j, copying it first unless it is stamped with version"""
+		p = j >> self.PAGE_BITS
+		if self._versions[p] != version:
+			self._pages[p] = list(self._pages[p])
+			self._versions[p] = version
+		return self._pages[p]
 
 class ChainHashMap(HashMapBase):
 	"""Concrete implementation of Hash Table with Separate Chaining for collision resolution.
-	Buckets are in turn Table Maps (unsorted)"""
+	Buckets are in turn Table Maps (unsorted).
+
+	snapshot() freezes the map in O(1) time by sharing the bucket array with the view.
+	The bucket array is a _PagedTable, so afterwards the writer copies the list of pages
+	on its first write (capacity / 64 references), then each page of 64 buckets and
+	each bucket (its list of item references) the first time it modifies them: pages and
+	buckets are stamped with the snapshot version current when they were created.
+	Items themselves are never modified, an overwrite replaces the item, so copies may
+	share them."""
+
+	_version = 0 #Incremented by snapshot(); buckets stamped with an older version may be shared
+	_shared_table = False #True while a snapshot may reference the bucket array
+
 	def __iter__(self):
 		for bucket in self._table: #Iterate over table
 			if bucket is not  None: #Nonempty slot in array
 				for key in bucket: #Iterate over bucket
 					yield key
+		if self._old is not None: #Entries not migrated yet
+			yield from self._old
 
-	def _bucket_getitem(self, j, k):
+	def _bucket_getitem(self, j, k, h):
 		bucket = self._table[j]
 		if bucket is None:
 			raise KeyError('Key Error ' + repr(k)) #No match found
-		return bucket[k] #Might raise KeyError
+		i = bucket._find_index(k, h)
+		if i < 0:
+			raise KeyError('Key Error ' + repr(k))
+		return bucket._table[i]._value
+
+	def _empty_table(self, c):
+		return _PagedTable(c, self._version)
+
+	def _writable_page(self, j):
+		"""Return the page of the bucket array holding bucket j, copying the list of pages
+		and the page itself first if a snapshot may share them"""
+		if self._shared_table:
+			self._table = self._table.copy()
+			self._shared_table = False
+		return self._table.writable_page(j, self._version)
 
-	def _bucket_delitem(self, j, k):
+	def _writable_bucket(self, j, create = False):
+		"""Return bucket j, copying it first if a snapshot may share it.
+		An empty bucket is returned as None, unless create is True."""
+		page = self._writable_page(j)
+		i = j & _PagedTable.PAGE_MASK
+		bucket = page[i]
+		if bucket is None:
+			if create:
+				bucket = page[i] = UnsortedTableMap() #Create new bucket at required position
+				bucket._version = self._version
+		elif bucket._version != self._version:
+			old = bucket
+			bucket = page[i] = UnsortedTableMap()
+			bucket._table = list(old._table) #Items are shared: they are never modified
+			bucket._version = self._version
+		return bucket
+
+	def _bucket_delitem(self, j, k, h):
 		bucket = self._table[j]
 		if bucket is None:
 			raise KeyError('Key Error ' + repr(k)) #No match found
-		del bucket[k] #Might raise KeyError
+		i = bucket._find_index(k, h)
+		if i < 0:
+			raise KeyError('Key Error ' + repr(k))
+		self._writable_bucket(j)._table.pop(i)
 	
-	def _bucket_setitem(self, j, k, v):
-		if self._table[j] is None:
-			self._table[j] = UnsortedTableMap() #Create new bucket at required position
-		oldsize = len(self._table[j]) #Old bucket size (might be zero if bucket is newly created)
-		self._table[j][k] = v #Store new item
-		if len(self._table[j]) > oldsize: #If key is new...
+	def _bucket_setitem(self, j, k, v, h):
+		bucket = self._writable_bucket(j, True)
+		i = bucket._find_index(k, h)
+		if i < 0: #If key is new...
+			bucket._table.append(self._Item(k, v, h))
 			self._n += 1 #Increase map size
+		else:
+			bucket._table[i] = self._Item(k, v, h) #Replace, do not modify: item may be shared
+
+	def _bucket_drain(self, j):
+		"""Empty bucket j and return the items it contained"""
+		bucket = self._table[j]
+		if bucket is None:
+			return []
+		self._writable_page(j)[j & _PagedTable.PAGE_MASK] = None
+		return bucket._table #Only read by the caller: no need to copy a shared bucket
+
+	def _probe_lengths(self):
+		for bucket in self._table:
+			if bucket is not None:
+				yield from range(1, len(bucket) + 1) #Position within chain
+
+	def stats(self):
+		"""Return dictionary with a snapshot of table statistics (see HashMapBase.stats),
+		including maximum and mean length of nonempty chains"""
+		result = super().stats()
+		chains = [len(bucket) for bucket in self._table if bucket is not None and len(bucket) > 0]
+		result['chain_max'] = max(chains, default = 0)
+		result['chain_mean'] = sum(chains) / len(chains) if chains else 0.0
+		return result
+
+	def snapshot(self):
+		"""Return a read-only MapSnapshot of the current contents in O(1) time"""
+		frozen = copy(self)
+		if self._old is not None: #Incremental resize in progress: freeze the old table too
+			frozen._old = copy(self._old)
+			self._old._version += 1
+			self._old._shared_table = True
+		self._version += 1
+		self._shared_table = True
+		return MapSnapshot(frozen)
 
 class ProbeHashMap(HashMapBase):
 	"""Concrete implementation of Hash Table using Open Addressing 
@@ -146,8 +593,8 @@ class ProbeHashMap(HashMapBase):
 		"""Return True if index j is available in table"""
 		return self._table[j] is None or self._table[j] is ProbeHashMap._AVAIL
 
-	def _find_slot(self, j, k):
-		"""Search for key k in bucket j.
+	def _find_slot(self, j, k, h):
+		"""Search for key k (with hash code h) in bucket j.
 		Return (success, index) tuple, described as follows:
 		If match was found, success is True and index denotes its location.
 		If no match found, success is False and index denotes first available slot."""
@@ -158,38 +605,765 @@ class ProbeHashMap(HashMapBase):
 					first_avail = j
 				if self._table[j] is None:
 					return (False, first_avail)
-			elif k == self._table[j]._key:
+			elif h == self._table[j]._hash and k == self._table[j]._key: #Cheap check first
 				return (True, j)
 			j = (j + 1) % len(self._table) #Keep looking cyclically
 
-	def _bucket_getitem(self, j, k):
-		found, s = self._find_slot(j, k)
+	def _bucket_getitem(self, j, k, h):
+		found, s = self._find_slot(j, k, h)
 		if not found:
 			raise KeyError('Key Error ' + repr(k))
 		return self._table[s]._value
 
-	def _bucket_delitem(self, j, k):
-		found, s = self._find_slot(j, k)
+	def _bucket_delitem(self, j, k, h):
+		found, s = self._find_slot(j, k, h)
 		if not found:
 			raise KeyError('Key Error ' + repr(k))
 		self._table[s] = ProbeHashMap._AVAIL #Mark as available
+		self._deleted += 1
 
-	def _bucket_setitem(self, j, k, v):
-		found, s = self._find_slot(j, k)
+	def _bucket_setitem(self, j, k, v, h):
+		found, s = self._find_slot(j, k, h)
 		if not found:
-			self._table[s] = self._Item(k, v) #new item
+			if self._table[s] is ProbeHashMap._AVAIL:
+				self._deleted -= 1 #Marker reused
+			self._table[s] = self._Item(k, v, h) #new item
 			self._n += 1 #Increase size
 		else:
 			self._table[s]._value = v #overwrite existing item
 
+	def _bucket_drain(self, j):
+		"""Empty slot j and return the items it contained"""
+		if self._is_available(j):
+			return []
+		item = self._table[j]
+		self._table[j] = ProbeHashMap._AVAIL #Keep probe chains of the old table intact
+		return [item]
+
+	def _probe_lengths(self):
+		for j in range(len(self._table)):
+			if not self._is_available(j):
+				yield (j - self._compress(self._table[j]._hash)) % len(self._table) + 1
+
 	def __iter__(self):
 		for j in range(len(self._table)):
 			if not self._is_available(j):
 				yield self._table[j]._key
+		if self._old is not None: #Entries not migrated yet
+			yield from self._old
+
+class RobinHoodHashMap(HashMapBase):
+	"""Concrete implementation of Hash Table using Open Addressing with Robin Hood
+	Linear Probing: an inserted item takes the slot of any item closer to its home
+	bucket, so probe distances are equalised. Deletion shifts the following items
+	one slot back instead of leaving deleted markers, and a search stops as soon as
+	it meets an item closer to home than the searched key would be."""
+
+	_MOVED = object() #Marks migrated slots of a table being drained by an incremental resize
+
+	def _distance(self, j, item):
+		"""Return distance of item (stored at index j) from its home bucket"""
+		return (j - self._compress(item._hash)) % len(self._table)
+
+	def _find_slot(self, j, k, h):
+		"""Search for key k (with hash code h) starting from home bucket j.
+		Return (success, index) tuple: if no match found, index denotes the slot where
+		an item with key k belongs (possibly occupied by an item to be displaced)."""
+		table = self._table
+		cap = len(table)
+		d = 0 #Probe distance from home bucket
+		while True:
+			item = table[j]
+			if item is None:
+				return (False, j)
+			if item is not RobinHoodHashMap._MOVED:
+				if self._distance(j, item) < d: #k would have displaced this item
+					return (False, j)
+				if h == item._hash and k == item._key:
+					return (True, j)
+			j = (j + 1) % cap
+			d += 1
+
+	def _bucket_getitem(self, j, k, h):
+		found, s = self._find_slot(j, k, h)
+		if not found:
+			raise KeyError('Key Error ' + repr(k))
+		return self._table[s]._value
+
+	def _bucket_setitem(self, j, k, v, h):
+		found, s = self._find_slot(j, k, h)
+		if found:
+			self._table[s]._value = v #overwrite existing item
+			return
+		table = self._table
+		cap = len(table)
+		new = self._Item(k, v, h)
+		d = (s - j) % cap
+		while table[s] is not None: #Take from the rich (closer to home) and carry on
+			d_s = self._distance(s, table[s])
+			if d_s < d:
+				table[s], new = new, table[s]
+				d = d_s
+			s = (s + 1) % cap
+			d += 1
+		table[s] = new
+		self._n += 1 #Increase size
+
+	def _bucket_delitem(self, j, k, h):
+		found, s = self._find_slot(j, k, h)
+		if not found:
+			raise KeyError('Key Error ' + repr(k))
+		table = self._table
+		cap = len(table)
+		nxt = (s + 1) % cap
+		while table[nxt] is not None:
+			if table[nxt] is RobinHoodHashMap._MOVED: #Old table only: keep chain unbroken
+				table[s] = RobinHoodHashMap._MOVED
+				return
+			if self._distance(nxt, table[nxt]) == 0: #Already in its home bucket
+				break
+			table[s] = table[nxt] #Backward shift
+			s = nxt
+			nxt = (nxt + 1) % cap
+		table[s] = None
+
+	def _bucket_drain(self, j):
+		"""Empty slot j and return the items it contained"""
+		item = self._table[j]
+		if item is None or item is RobinHoodHashMap._MOVED:
+			return []
+		self._table[j] = RobinHoodHashMap._MOVED #Later slots must not shift into drained ones
+		return [item]
+
+	def _probe_lengths(self):
+		for j in range(len(self._table)):
+			item = self._table[j]
+			if item is not None and item is not RobinHoodHashMap._MOVED:
+				yield self._distance(j, item) + 1
+
+	def __iter__(self):
+		for item in self._table:
+			if item is not None and item is not RobinHoodHashMap._MOVED:
+				yield item._key
+		if self._old is not None: #Entries not migrated yet
+			yield from self._old
+
+class CuckooHashMap(HashMapBase):
+	"""Concrete implementation of Hash Table using Cuckoo Hashing.
+	Each key may only live in one of d slots, given by d independently seeded MAD
+	functions, so a lookup inspects at most d slots in the worst case. An insertion
+	into d occupied slots evicts one of the occupants, which moves to another of its
+	slots, and so on; if the chain exceeds MAX_EVICTIONS the table is rebuilt with
+	fresh MAD functions. Resizes always happen at once.
+
+	Keys with equal hash codes share their d slots under every choice of functions,
+	so no rebuild can separate more than d of them: items left homeless go to a small
+	stash, which lookups scan after the d slots, and rebuilds are attempted at most
+	MAX_REBUILDS times before an insertion fails with RuntimeError."""
+
+	MAX_EVICTIONS = 64 #Longest eviction chain before rehashing
+	STASH_SIZE = 4 #Items that may live outside the table
+	MAX_REBUILDS = 8 #Rebuild attempts (capacity doubling every 4) before giving up
+
+	def __init__(self, cap = 11, p = 109345121, d = 3):
+		"""Create an empty hash-table map.
+		Parameters.
+		cap: int. Initial capacity of the table
+		p: int. Prime number used in MAD.
+		d: int. Number of hash functions (at least 2)
+		"""
+		if d < 2:
+			raise ValueError("Cuckoo hashing needs at least two hash functions")
+		super().__init__(cap, p)
+		self._d = d
+		self._stash = [] #Homeless items (few, mostly keys with colliding hash codes)
+		self._seed()
+
+	#---------------------------------Nonpublic Methods---------------------------------
+	def _seed(self):
+		"""Draw d new MAD functions; the first one is HashMapBase's own"""
+		self._scales = [1 + randrange(self._prime - 1) for i in range(self._d)]
+		self._shifts = [randrange(self._prime) for i in range(self._d)]
+		self._scale, self._shift = self._scales[0], self._shifts[0]
+
+	def _positions(self, h):
+		"""Return the d candidate slots for hash code h"""
+		c = len(self._table)
+		return [(h*a + b) % self._prime % c for (a, b) in zip(self._scales, self._shifts)]
+
+	def _locate(self, k, h):
+		"""Return (container, index) of item with key k (and hash code h), where container
+		is the table or the stash. Return (None, -1) if not found."""
+		for j in self._positions(h):
+			item = self._table[j]
+			if item is not None and h == item._hash and k == item._key:
+				return (self._table, j)
+		for j in range(len(self._stash)):
+			item = self._stash[j]
+			if h == item._hash and k == item._key:
+				return (self._stash, j)
+		return (None, -1)
+
+	def _place(self, item, undo = False):
+		"""Store item, evicting occupants as needed.
+		Return None on success, or the item left homeless after MAX_EVICTIONS evictions.
+		If undo is True, a failure moves every evicted item back and returns item itself."""
+		table = self._table
+		last = -1 #Slot the current item was just evicted from
+		path = [] #Slots written so far
+		for i in range(self.MAX_EVICTIONS):
+			positions = self._positions(item._hash)
+			for j in positions:
+				if table[j] is None:
+					table[j] = item
+					return None
+			last = choice([j for j in positions if j != last] or positions) #Do not bounce straight back
+			table[last], item = item, table[last]
+			path.append(last)
+		if undo:
+			for j in reversed(path):
+				table[j], item = item, table[j]
+		return item
+
+	def _rebuild(self, c, extra = None):
+		"""Rehash all items (plus extra, if given) into a table of capacity c with new functions.
+		The capacity grows if repeated attempts fail. After MAX_REBUILDS failures the map
+		is left as it was; then raise RuntimeError if extra was given (extra is not stored)."""
+		items = [item for item in self._table if item is not None] + self._stash
+		if extra is not None:
+			items.append(extra)
+		saved = (self._table, self._stash, self._scales, self._shifts)
+		for attempt in range(1, self.MAX_REBUILDS + 1):
+			self._table = c * [None]
+			self._stash = []
+			self._seed()
+			for item in items:
+				homeless = self._place(item)
+				if homeless is not None:
+					if len(self._stash) == self.STASH_SIZE:
+						break #Attempt failed
+					self._stash.append(homeless)
+			else:
+				return
+			if attempt % 4 == 0:
+				c = 2 * c - 1 #Unlucky or too full: make room
+		self._table, self._stash, self._scales, self._shifts = saved #Give up: restore previous layout
+		self._scale, self._shift = self._scales[0], self._shifts[0]
+		if extra is not None:
+			raise RuntimeError('Cuckoo hashing failed: too many keys with colliding hash codes')
+
+	def _resize_table(self, c):
+		"""Resize table to capacity c (never incrementally)"""
+		self._rebuild(c)
+
+	def _probe_lengths(self):
+		for j in range(len(self._table)):
+			item = self._table[j]
+			if item is not None:
+				yield self._positions(item._hash).index(j) + 1 #Rank of slot among candidates
+		for j in range(len(self._stash)):
+			yield self._d + j + 1 #Stash is scanned after all candidates
+
+	def _bucket_getitem(self, j, k, h):
+		container, s = self._locate(k, h)
+		if s < 0:
+			raise KeyError('Key Error ' + repr(k))
+		return container[s]._value
+
+	def _bucket_delitem(self, j, k, h):
+		container, s = self._locate(k, h)
+		if s < 0:
+			raise KeyError('Key Error ' + repr(k))
+		if container is self._stash:
+			self._stash.pop(s)
+		else:
+			self._table[s] = None
+
+	def _bucket_setitem(self, j, k, v, h):
+		container, s = self._locate(k, h)
+		if s >= 0:
+			container[s]._value = v #overwrite existing item
+			return
+		homeless = self._place(self._Item(k, v, h), True) #On failure the table is left untouched
+		if homeless is not None:
+			if len(self._stash) < self.STASH_SIZE:
+				self._stash.append(homeless)
+			else:
+				self._rebuild(len(self._table), homeless) #Might raise RuntimeError
+		self._n += 1 #Increase size
+
+	def __iter__(self):
+		for item in self._table:
+			if item is not None:
+				yield item._key
+		for item in self._stash:
+			yield item._key
+
+class CompactProbeHashMap(HashMapBase):
+	"""Open Addressing with Linear Probing using parallel arrays instead of _Item objects.
+	Keys and values live in two flat lists and full hash codes in an array('q'), which
+	stores them unboxed (8 bytes each, no int object per entry); capacity is always
+	a power of two so that compression ends with a bit mask rather than a modulo."""
+
+	_FREE = object() #sentinel for never used slots (keys may legitimately be None)
+	_AVAIL = object() #sentinel for slots of deleted items
+
+	def __init__(self, cap = 16, p = 109345121):
+		"""Create an empty map.
+		Parameters.
+		cap: int. Minimum initial capacity (rounded up to a power of two)
+		p: int. Prime number used in MAD.
+		"""
+		self._prime = p
+		self._n = 0 #Number of stored entries
+		self._scale = 1 + randrange(p - 1) #scale from 1 to p-1 for MAD
+		self._shift = randrange(p) #shift from 0 to p-1 for MAD
+		self._old = None #Resizes are never incremental here
+		self._min_capacity = cap
+		self._resizes = 0
+		self._resize_time = 0.0
+		self._migrate_time = 0.0
+		self._allocate(cap)
+
+	#---------------------------------Nonpublic Methods---------------------------------
+	def _allocate(self, cap):
+		"""Install empty arrays with capacity equal to the least power of two >= cap"""
+		c = 8
+		while c < cap:
+			c <<= 1
+		self._keys = c * [CompactProbeHashMap._FREE]
+		self._values = c * [None]
+		self._hashes = array('q', bytes(8 * c)) #Zeroed; hash() always fits a C long long
+		self._mask = c - 1
+		self._used = 0 #Live entries plus deleted markers (bounds probe length)
+
+	def _find_slot(self, k, h):
+		"""Search for key k having full hash code h.
+		Return (success, index) tuple with the same meaning as ProbeHashMap._find_slot"""
+		keys = self._keys #Local aliases keep the loop tight
+		hashes = self._hashes
+		mask = self._mask
+		free = CompactProbeHashMap._FREE
+		avail = CompactProbeHashMap._AVAIL
+		j = (h * self._scale + self._shift) % self._prime & mask
+		first_avail = -1
+		while True:
+			key = keys[j]
+			if key is free:
+				return (False, j if first_avail < 0 else first_avail)
+			if key is avail:
+				if first_avail < 0:
+					first_avail = j
+			elif hashes[j] == h and (key is k or key == k): #Cheap hash check first
+				return (True, j)
+			j = (j + 1) & mask #Keep looking cyclically
+
+	@property
+	def _deleted(self):
+		"""Number of deleted markers"""
+		return self._used - self._n
+
+	def _table_size(self):
+		return len(self._keys)
+
+	def _probe_lengths(self):
+		for j in range(len(self._keys)):
+			if self._is_occupied(j):
+				yield ((j - ((self._hashes[j] * self._scale + self._shift) % self._prime & self._mask)) & self._mask) + 1
+
+	def _resize_table(self, c):
+		"""Rebuild arrays with capacity c, reusing cached hash codes"""
+		old = [(self._keys[j], self._values[j], self._hashes[j])
+				for j in range(len(self._keys)) if self._is_occupied(j)]
+		self._allocate(c)
+		keys, values, hashes, mask = self._keys, self._values, self._hashes, self._mask
+		free = CompactProbeHashMap._FREE
+		for (k, v, h) in old: #Keys are known to be distinct: only look for a free slot
+			j = (h * self._scale + self._shift) % self._prime & mask
+			while keys[j] is not free:
+				j = (j + 1) & mask
+			keys[j], values[j], hashes[j] = k, v, h
+		self._used = len(old)
+
+	def _is_occupied(self, j):
+		"""Return True if slot j stores a live entry"""
+		key = self._keys[j]
+		return key is not CompactProbeHashMap._FREE and key is not CompactProbeHashMap._AVAIL
+
+	#----------------------------------Public Methods-----------------------------------
+	def __getitem__(self, k):
+		found, s = self._find_slot(k, hash(k))
+		if not found:
+			raise KeyError('Key Error ' + repr(k))
+		return self._values[s]
+
+	def __setitem__(self, k, v):
+		h = hash(k)
+		found, s = self._find_slot(k, h)
+		if found:
+			self._values[s] = v #overwrite existing item
+			return
+		if self._keys[s] is CompactProbeHashMap._FREE:
+			self._used += 1 #Reusing a deleted slot does not lengthen probes
+		self._keys[s], self._values[s], self._hashes[s] = k, v, h
+		self._n += 1
+		if self._used > len(self._keys) // 2: #Keep load factor (deleted slots included) <= 1/2
+			self._resize(2 * len(self._keys) if self._n > len(self._keys) // 4 else len(self._keys))
+
+	def __delitem__(self, k):
+		found, s = self._find_slot(k, hash(k))
+		if not found:
+			raise KeyError('Key Error ' + repr(k))
+		self._keys[s] = CompactProbeHashMap._AVAIL #Mark as available
+		self._values[s] = None #Release reference to value
+		self._n -= 1
+		if self._n < len(self._keys) * self.MIN_LOAD and len(self._keys) > self._min_capacity:
+			self._resize(len(self._keys) // 2)
+
+	def __iter__(self):
+		for j in range(len(self._keys)):
+			if self._is_occupied(j):
+				yield self._keys[j]
+
+	#-------------------------------Batch Operations-------------------------------
+	def get_many(self, keys, default = None):
+		"""Return list with the value of each key in keys (default for missing ones)"""
+		keys = list(keys)
+		hashes = [hash(k) for k in keys] #Whole batch hashed up front
+		find = self._find_slot
+		values = self._values
+		result = []
+		append = result.append
+		for (k, h) in zip(keys, hashes):
+			found, s = find(k, h)
+			append(values[s] if found else default)
+		return result
+
+	def set_many(self, pairs):
+		"""Assign each (k, v) pair of pairs, resizing at most once for the whole batch"""
+		pairs = list(pairs)
+		hashes = [hash(k) for (k, v) in pairs]
+		bound = self._n + len(pairs) #Final size if all keys are new
+		if self._used + len(pairs) > len(self._keys) // 2:
+			self._resize(2 * bound) #Also purges deleted markers
+		find = self._find_slot
+		keys, values, hashes_table = self._keys, self._values, self._hashes
+		free = CompactProbeHashMap._FREE
+		for ((k, v), h) in zip(pairs, hashes):
+			found, s = find(k, h)
+			if not found:
+				if keys[s] is free:
+					self._used += 1
+				keys[s], hashes_table[s] = k, h
+				self._n += 1
+			values[s] = v
+
+	def delete_many(self, keys):
+		"""Remove every key of keys present in map, shrinking at most once for the whole batch.
+		Return number of removed keys (missing keys are ignored)."""
+		keys = list(keys)
+		hashes = [hash(k) for k in keys]
+		find = self._find_slot
+		keys_table, values = self._keys, self._values
+		avail = CompactProbeHashMap._AVAIL
+		removed = 0
+		for (k, h) in zip(keys, hashes):
+			found, s = find(k, h)
+			if found:
+				keys_table[s] = avail
+				values[s] = None
+				removed += 1
+		self._n -= removed
+		if self._n < len(self._keys) * self.MIN_LOAD and len(self._keys) > self._min_capacity:
+			self._resize(max(self._min_capacity, 3 * self._n))
+		return removed
+
+
+class HashMultiMap(ChainHashMap):
+	"""Hash table with separate chaining in which a key may have many values.
+	Every (k, v) pair is an item of its own in the bucket of k, in insertion order, so
+	no list is allocated per key, and get_all() scans one bucket.
+	As a Mapping, the multimap associates each distinct key with its first value:
+	len() and iteration count distinct keys, m[k] is the first value of k, and
+	m[k] = v or set_many() make v the only value of k. pair_count() and pairs()
+	cover all pairs. Resizes are never incremental."""
+
+	def __init__(self, cap = 11, p = 109345121):
+		"""Create an empty multimap (see HashMapBase for parameters)"""
+		super().__init__(cap, p)
+		self._keys = 0 #Number of distinct keys (self._n counts pairs)
+
+	#---------------------------------Nonpublic Methods---------------------------------
+	def _bucket_setitem(self, j, k, v, h):
+		"""Append new item (k, v) to bucket j, whether k is present or not"""
+		bucket = self._writable_bucket(j, True)
+		bucket._table.append(self._Item(k, v, h))
+		self._n += 1
+
+	def _matches(self, item, k, h):
+		return item._hash == h and item._key == k
+
+	#----------------------------------Public Methods-----------------------------------
+	def __len__(self):
+		"""Return number of distinct keys"""
+		return self._keys
+
+	def pair_count(self):
+		"""Return number of (k, v) pairs"""
+		return self._n
+
+	def add(self, k, v):
+		"""Add pair (k, v), keeping the values already associated with k"""
+		h = hash(k)
+		j = self._compress(h)
+		bucket = self._table[j]
+		if bucket is None or bucket._find_index(k, h) < 0:
+			self._keys += 1 #First value of k
+		self._bucket_setitem(j, k, v, h)
+		self._grow_if_full()
+
+	def get_all(self, k):
+		"""Generate the values associated with key k in insertion order (none if k is absent)"""
+		h = hash(k)
+		bucket = self._table[self._compress(h)]
+		if bucket is not None:
+			for item in bucket._table:
+				if self._matches(item, k, h):
+					yield item._value
+
+	def remove_one(self, k, v):
+		"""Remove one occurrence of pair (k, v). Raise KeyError if there is none."""
+		h = hash(k)
+		j = self._compress(h)
+		bucket = self._table[j]
+		if bucket is not None:
+			for i in range(len(bucket._table)):
+				item = bucket._table[i]
+				if self._matches(item, k, h) and item._value == v:
+					bucket = self._writable_bucket(j)
+					bucket._table.pop(i)
+					self._n -= 1
+					if bucket._find_index(k, h) < 0:
+						self._keys -= 1 #Last value of k
+					self._shrink_if_sparse()
+					return
+		raise KeyError('Key Error ' + repr((k, v)))
+
+	def remove_all(self, k):
+		"""Remove all values associated with key k; return their number"""
+		h = hash(k)
+		j = self._compress(h)
+		bucket = self._table[j]
+		if bucket is None:
+			return 0
+		removed = sum(1 for item in bucket._table if self._matches(item, k, h))
+		if removed:
+			bucket = self._writable_bucket(j)
+			bucket._table = [item for item in bucket._table if not self._matches(item, k, h)]
+			self._n -= removed
+			self._keys -= 1
+			self._shrink_if_sparse()
+		return removed
+
+	def __setitem__(self, k, v):
+		"""Make v the only value associated with key k"""
+		self.remove_all(k)
+		self.add(k, v)
+
+	def __delitem__(self, k):
+		"""Remove all values associated with key k (raise KeyError if there are none)"""
+		if not self.remove_all(k):
+			raise KeyError('Key Error ' + repr(k))
+
+	def __iter__(self):
+		"""Iterate over distinct keys"""
+		for bucket in self._table:
+			if bucket is not None:
+				seen = [] #Keys of this bucket already reported (chains are short)
+				for item in bucket._table:
+					if item._key not in seen:
+						seen.append(item._key)
+						yield item._key
+
+	def __eq__(self, other):
+		"""Multimaps are equal if they associate the same values, in the same order, with the same keys"""
+		if not isinstance(other, (HashMultiMap, SortedMultiMap)):
+			return NotImplemented
+		return (len(self) == len(other) and self.pair_count() == other.pair_count() and
+				all(list(self.get_all(k)) == list(other.get_all(k)) for k in self))
+
+	def pairs(self):
+		"""Generate all (k, v) pairs"""
+		for bucket in self._table:
+			if bucket is not None:
+				for item in bucket._table:
+					yield (item._key, item._value)
+
+	def set_many(self, pairs):
+		"""Make v the only value of k for each (k, v) pair of pairs, resizing at most once"""
+		pairs = list(pairs)
+		self._reserve(len(pairs))
+		for (k, v) in pairs:
+			self[k] = v
+
+	def delete_many(self, keys):
+		"""Remove all values of every key of keys; return number of keys removed"""
+		return sum(1 for k in keys if self.remove_all(k))
+
+	def dump(self, fileobj):
+		"""Write all pairs to binary file fileobj (see HashMapBase.dump)"""
+		pairs = list(self.pairs())
+		_dump_columns(fileobj, [k for (k, v) in pairs], [v for (k, v) in pairs], False)
+
+	@classmethod
+	def load(cls, fileobj):
+		"""Return a new multimap with all pairs written by dump() to fileobj"""
+		keys, values, is_sorted = _load_columns(fileobj)
+		result = cls()
+		result._reserve(len(keys))
+		for (k, v) in zip(keys, values):
+			result.add(k, v)
+		return result
+
+class CounterMap(ProbeHashMap):
+	"""Hash map from keys to counts. increment() updates a count with a single probe
+	sequence, where m[k] = m.get(k, 0) + delta searches the table twice."""
+
+	def _bucket_increment(self, j, k, delta, h):
+		"""Add delta to the count of key k in bucket j, inserting k with count delta if absent.
+		Return the new count."""
+		found, s = self._find_slot(j, k, h)
+		if found:
+			item = self._table[s]
+			item._value += delta
+			return item._value
+		if self._table[s] is ProbeHashMap._AVAIL:
+			self._deleted -= 1 #Marker reused
+		self._table[s] = self._Item(k, delta, h)
+		self._n += 1
+		return delta
+
+	def increment(self, k, delta = 1):
+		"""Add delta to the count of key k (counts start at 0) and return the new count"""
+		h = hash(k)
+		if self._old is not None:
+			self._rehash_step()
+			if self._old is not None: #Move count of k out of the old table, if there
+				old = self._old
+				j = old._compress(h)
+				try:
+					delta += old._bucket_getitem(j, k, h)
+					old._bucket_delitem(j, k, h)
+					old._n -= 1
+				except KeyError:
+					pass
+		count = self._bucket_increment(self._compress(h), k, delta, h)
+		self._grow_if_full()
+		return count
+
+class ConcurrentHashMap(MapBase):
+	"""Thread-safe hash map with striped locking.
+	Keys are spread over independent hash map segments, each guarded by its own
+	lock, so threads touching different segments never wait for each other and
+	every segment resizes on its own. Iteration is weakly consistent: each segment
+	is copied under its lock in turn, so concurrent updates never break it, but
+	may or may not be reflected."""
+
+	_MISSING = object() #sentinel for pop without default
+
+	def __init__(self, segments = 16, segment_type = ProbeHashMap):
+		"""Create an empty map.
+		Parameters.
+		segments: int. Number of independently locked segments
+		segment_type: HashMapBase subclass used for each segment
+		"""
+		self._segments = [segment_type() for j in range(segments)]
+		self._locks = [RLock() for j in range(segments)] #Reentrant: callbacks may use the map
+
+	def _segment(self, k):
+		"""Return (segment, lock) pair responsible for key k"""
+		j = hash(k) % len(self._segments)
+		return (self._segments[j], self._locks[j])
+
+	def __len__(self):
+		"""Return number of stored entries (a moving target under concurrent updates)"""
+		total = 0
+		for segment, lock in zip(self._segments, self._locks):
+			with lock: #Never observe a segment in the middle of a resize
+				total += len(segment)
+		return total
+
+	def __getitem__(self, k):
+		segment, lock = self._segment(k)
+		with lock:
+			return segment[k] #Might raise KeyError
+
+	def __setitem__(self, k, v):
+		segment, lock = self._segment(k)
+		with lock:
+			segment[k] = v
+
+	def __delitem__(self, k):
+		segment, lock = self._segment(k)
+		with lock:
+			del segment[k] #Might raise KeyError
+
+	def __contains__(self, k):
+		segment, lock = self._segment(k)
+		with lock:
+			return k in segment
+
+	def __iter__(self):
+		"""Weakly consistent iteration over keys, one segment snapshot at a time"""
+		for segment, lock in zip(self._segments, self._locks):
+			with lock:
+				keys = list(segment)
+			yield from keys
+
+	def setdefault(self, k, default = None):
+		"""Atomically return value for key k, storing default first if k is absent"""
+		segment, lock = self._segment(k)
+		with lock:
+			try:
+				return segment[k]
+			except KeyError:
+				segment[k] = default
+				return default
 
+	def compute_if_absent(self, k, fn):
+		"""Atomically return value for key k, storing fn(k) first if k is absent.
+		fn runs under the segment lock, so it is called at most once per missing key."""
+		segment, lock = self._segment(k)
+		with lock:
+			try:
+				return segment[k]
+			except KeyError:
+				v = fn(k)
+				segment[k] = v
+				return v
+
+	def pop(self, k, default = _MISSING):
+		"""Atomically remove key k and return its value.
+		If k is absent, return default if given, else raise KeyError."""
+		segment, lock = self._segment(k)
+		with lock:
+			try:
+				v = segment[k]
+			except KeyError:
+				if default is ConcurrentHashMap._MISSING:
+					raise
+				return default
+			del segment[k]
+			return v
 
 class  SortedTableMap(MapBase):
-	"""Map implementation via sorted table"""
+	"""Map implementation via sorted table.
+	snapshot() freezes the map in O(1) time by sharing the table with the view;
+	the writer copies the table (a list of item references) on its first write
+	afterwards. Items are never modified, an overwrite replaces the item, so both
+	lists may share them."""
+
+	_shared = False #True while a snapshot may reference the table
 
 	#---------------------------------Nonpublic Methods---------------------------------
 	def _find_index(self, k, low, high):
@@ -199,17 +1373,47 @@ class  SortedTableMap(MapBase):
 			That is, j will be returned such that:
 			all items of slice table[low:j] have key < k
 			all items of slice table[j:high+1] have key >= k
+		Iterative binary search (bisect module), no Python frame per halving.
 		"""
-		if high < low:
-			return high + 1 #No element qualifies
-		else:
-			mid = (low + high) // 2
-			if k == self._table[mid]._key:
-				return mid
-			elif k < self._table[mid]._key:
-				return self._find_index(k, low, mid - 1) #notice might return mid
-			else:
-				return self._find_index(k, mid + 1, high)
+		return bisect_left(self._table, k, low, high + 1, key = _item_key)
+
+	def _merge(self, old, pairs):
+		"""Merge an iteration of (k, v) pairs sorted by key with sorted list of items old,
+		in one pass, and return the merged list of items (old is left untouched).
+		On equal keys the value from pairs wins. Raise ValueError if pairs are not sorted."""
+		merged = []
+		i = 0
+		last = None
+		for (k, v) in pairs:
+			if merged and k < last:
+				raise ValueError('Input is not sorted by key')
+			if merged and k == last: #Duplicate in input: keep last value
+				merged[-1]._value = v
+				continue
+			while i < len(old) and old[i]._key < k: #Copy smaller existing items
+				merged.append(old[i])
+				i += 1
+			if i < len(old) and old[i]._key == k:
+				i += 1 #Overwritten: old item is replaced, so a failed merge leaves map intact
+			merged.append(self._Item(k, v))
+			last = k
+		merged.extend(old[i:]) #Remaining existing items
+		return merged
+
+	def _build(self, items):
+		"""Replace contents with sorted list of items"""
+		self._table = items
+
+	def _writable_table(self):
+		"""Return the table, copying it first if a snapshot may share it"""
+		if self._shared:
+			self._table = list(self._table)
+			self._shared = False
+		return self._table
+
+	def _items(self):
+		"""Generate items from min to max key"""
+		return iter(self._table)
 
 
 	#----------------------------------Public Methods-----------------------------------
@@ -217,6 +1421,39 @@ class  SortedTableMap(MapBase):
 		"""Create empty table"""
 		self._table = []
 
+	@classmethod
+	def from_sorted(cls, pairs):
+		"""Build a map from an iteration of (k, v) pairs sorted by key in O(n) time.
+		Raise ValueError if pairs are not sorted."""
+		result = cls()
+		result.update_sorted(pairs)
+		return result
+
+	def update_sorted(self, pairs):
+		"""Merge an iteration of (k, v) pairs sorted by key in O(n + m) time,
+		overwriting values of existing keys. Raise ValueError if pairs are not sorted."""
+		self._table = self._merge(self._table, pairs) #New list: old one is left untouched
+		self._shared = False
+
+	def dump(self, fileobj):
+		"""Write all entries to binary file fileobj as a key column and a value column (min to max key).
+		As for hash maps, load() accepts plain keys and values only."""
+		items = list(self._items())
+		_dump_columns(fileobj, [item._key for item in items], [item._value for item in items], True)
+
+	@classmethod
+	def load(cls, fileobj):
+		"""Return a new map with the entries written by dump() (of any map class) to fileobj.
+		Dumps of sorted maps are taken as they are, in O(n) time; others are sorted first.
+		Like HashMapBase.load, it raises pickle.UnpicklingError rather than load other classes."""
+		keys, values, is_sorted = _load_columns(fileobj)
+		pairs = zip(keys, values)
+		if not is_sorted:
+			pairs = sorted(pairs, key = lambda pair: pair[0])
+		result = cls()
+		result._build([cls._Item(k, v) for (k, v) in pairs])
+		return result
+
 	def __len__(self):
 		"""Return number of stored entries"""
 		return len(self._table)
@@ -224,26 +1461,27 @@ class  SortedTableMap(MapBase):
 	def __getitem__(self, k):
 		"""Return value associated with key k.
 		Raise KeyError if not found"""
-		j = self._find_index(k, 0, len(self) - 1)
-		if j == len(self) or self._table[j]._key != j:
+		j = self._find_index(k, 0, len(self._table) - 1)
+		if j == len(self._table) or self._table[j]._key != k:
 			raise KeyError('Key Error ' + repr(k))
 		return self._table[j]._value
 
 	def __setitem__(self, k, v):
 		"""Assign value v to key k; overwriting if k is already present in map"""
-		j = self._find_index(k, 0, len(self) - 1) 
-		if j < len(self) and self._table[j]._key == k:
-			self._table[j]._value = v #Overwrite
+		j = self._find_index(k, 0, len(self._table) - 1) 
+		table = self._writable_table()
+		if j < len(self._table) and table[j]._key == k:
+			table[j] = self._Item(k, v) #Overwrite by replacing: item may be shared
 		else:
-			self._table.insert(j, self._Item(k, v)) #Add new element
+			table.insert(j, self._Item(k, v)) #Add new element
 
 	def __delitem__(self, k):
 		"""Delete item associated with key k.
 		Raise KeyError if not found."""
-		j = self._find_index(k, 0, len(self) - 1)
-		if j == len(self) or self._table[j]._key != j:
+		j = self._find_index(k, 0, len(self._table) - 1)
+		if j == len(self._table) or self._table[j]._key != k:
 			raise KeyError('Key Error ' + repr(k))
-		self._table.pop(j) #Remove Item
+		self._writable_table().pop(j) #Remove Item
 
 	def __iter__(self):
 		"""Iterate over keys stored in table (min to max)"""
@@ -255,41 +1493,50 @@ class  SortedTableMap(MapBase):
 		for item in reversed(self._table):
 			yield item._key
 
+	def snapshot(self):
+		"""Return a read-only MapSnapshot of the current contents in O(1) time.
+		The first write afterwards copies the whole table, in O(n) time (like an
+		insertion into the sorted list); for frequent snapshots under writes use
+		ChunkedSortedTableMap, whose writes copy only the chunk they modify."""
+		frozen = copy(self)
+		self._shared = True
+		return MapSnapshot(frozen)
+
 	def find_min(self):
 		"""Return (key, value) tuple with minimun key (or None if empty)"""
-		if len(self) > 0:
+		if len(self._table) > 0:
 			return (self._table[0]._key, self._table[0]._value)
 		else:
 			return None
 			
 	def find_max(self):
 		"""Return (key, value) tuple with maximun key (or None if empty)"""
-		if len(self) > 0:
+		if len(self._table) > 0:
 			return (self._table[-1]._key, self._table[-1]._value)
 		else:
 			return None
 			
 	def find_ge(self, k):
 		"""Return (key, value) tuple with least key greater or equal than k"""
-		j = self._find_index(k, 0, len(self) - 1) #key[j] >= k
-		if j < len(self):
+		j = self._find_index(k, 0, len(self._table) - 1) #key[j] >= k
+		if j < len(self._table):
 			return (self._table[j]._key, self._table[j]._value) 
 		else:
 			return None
 
 	def find_gt(self, k):
 		"""Return (key, value) tuple with least key strictly greater than k"""
-		j = self._find_index(k, 0, len(self) - 1) #key[j] >= k
-		if j < len(self) and self._table[j]._key == k:
+		j = self._find_index(k, 0, len(self._table) - 1) #key[j] >= k
+		if j < len(self._table) and self._table[j]._key == k:
 			j += 1 #Advanced past match
-		if j < len(self):
+		if j < len(self._table):
 			return (self._table[j]._key, self._table[j]._value)
 		else:
 			return None
 
 	def find_lt(self, k):
 		"""Return (key, value) tuple with max key strictly smaller than k"""
-		j = self._find_index(k, 0, len(self) - 1) #key[j] >= k
+		j = self._find_index(k, 0, len(self._table) - 1) #key[j] >= k
 		if j > 0:
 			return (self._table[j - 1]._key, self._table[j - 1]._value) 
 		else:
@@ -302,11 +1549,660 @@ class  SortedTableMap(MapBase):
 		if start is None:
 			j = 0
 		else:
-			j = self._find_index(start, 0, len(self) - 1)
-		while j < len(self) and (stop is None or self._table[j]._key < stop):
+			j = self._find_index(start, 0, len(self._table) - 1)
+		while j < len(self._table) and (stop is None or self._table[j]._key < stop):
 			yield (self._table[j]._key, self._table[j]._value)
 			j += 1
 
+	#-----------------------------Order Statistics-------------------------------
+	def rank(self, k):
+		"""Return number of keys strictly smaller than k"""
+		return self._find_index(k, 0, len(self._table) - 1)
+
+	def select(self, i):
+		"""Return (key, value) tuple of the item with rank i (negative i counts from the end).
+		Raise IndexError if i is out of range."""
+		if not -len(self._table) <= i < len(self._table):
+			raise IndexError('Rank out of range ' + repr(i))
+		item = self._table[i]
+		return (item._key, item._value)
+
+	def count_range(self, start, stop):
+		"""Return number of keys such that start <= key < stop (None bounds as in find_range)"""
+		low = 0 if start is None else self.rank(start)
+		high = len(self) if stop is None else self.rank(stop)
+		return max(0, high - low)
+
+	def items_range(self, i, j):
+		"""Iterate (key, value) tuples of items with rank in slice [i:j]"""
+		for item in self._table[i:j]:
+			yield (item._key, item._value)
+
+	#-----------------------------Merge-based Operations-------------------------------
+	def _outer_merge(self, other):
+		"""Generate (a, b) pairs of items with equal keys from self and other, in key order,
+		merging both tables in one pass; a (b) is None if the key is missing in self (other)"""
+		left = self._items()
+		right = other._items()
+		a = next(left, None)
+		b = next(right, None)
+		while a is not None and b is not None:
+			if a._key < b._key:
+				yield (a, None)
+				a = next(left, None)
+			elif b._key < a._key:
+				yield (None, b)
+				b = next(right, None)
+			else:
+				yield (a, b)
+				a = next(left, None)
+				b = next(right, None)
+		while a is not None: #At most one of the tables has items left
+			yield (a, None)
+			a = next(left, None)
+		while b is not None:
+			yield (None, b)
+			b = next(right, None)
+
+	def _from_items(self, items):
+		"""Return new map of the same class holding copies of the sorted items"""
+		result = type(self)()
+		result._build([self._Item(item._key, item._value) for item in items])
+		return result
+
+	def union(self, other):
+		"""Return new map with the keys of self and of sorted table map other, in O(n + m) time.
+		On common keys the value of self wins."""
+		return self._from_items(a if a is not None else b for (a, b) in self._outer_merge(other))
+
+	def intersection(self, other):
+		"""Return new map with the keys of self also in sorted table map other (values of self),
+		in O(n + m) time"""
+		return self._from_items(a for (a, b) in self._outer_merge(other) if a is not None and b is not None)
+
+	def difference(self, other):
+		"""Return new map with the keys of self not in sorted table map other, in O(n + m) time"""
+		return self._from_items(a for (a, b) in self._outer_merge(other) if b is None)
+
+	def merge_join(self, other, how = 'inner'):
+		"""Generate (k, v, w) tuples joining self with sorted table map other on key, in key order,
+		where v (w) is the value of k in self (other), in O(n + m) time.
+		how: 'inner' for keys in both maps, 'left' for all keys of self, 'outer' for all keys;
+		a missing value is None."""
+		if how == 'inner':
+			pairs = ((a, b) for (a, b) in self._outer_merge(other) if a is not None and b is not None)
+		elif how == 'left':
+			pairs = ((a, b) for (a, b) in self._outer_merge(other) if a is not None)
+		elif how == 'outer':
+			pairs = self._outer_merge(other)
+		else:
+			raise ValueError("how must be 'inner', 'left' or 'outer'")
+		return ((a._key if a is not None else b._key, a._value if a is not None else None,
+				b._value if b is not None else None) for (a, b) in pairs)
+
+
+class ChunkedSortedTableMap(SortedTableMap):
+	"""Sorted map stored as a list of sorted chunks, plus an index holding the maximum
+	key of each chunk (after the SortedList of the sortedcontainers package).
+	A mutation shifts items within a single chunk of at most 2*LOAD items and touches
+	the index only when a chunk is split, emptied or gets a new maximum, so inserts
+	and deletes cost O(log n + LOAD + n/LOAD) rather than O(n).
+	After a snapshot(), the writer copies the index lists on its first write, and
+	each chunk (a list of item references) the first time it modifies it."""
+
+	_owned = None #ids of chunks created or copied since the last snapshot (None: no snapshot taken)
+
+	LOAD = 1000 #Target chunk size; chunks are split beyond 2*LOAD items
+
+	#---------------------------------Nonpublic Methods---------------------------------
+	def _build(self, items):
+		"""Replace contents with sorted list of items, cut into chunks of LOAD items"""
+		self._chunks = [items[i:i + self.LOAD] for i in range(0, len(items), self.LOAD)]
+		self._maxes = [chunk[-1]._key for chunk in self._chunks]
+		self._size = len(items)
+
+	def _locate(self, k):
+		"""Return (c, i) such that chunk c, offset i holds the leftmost item with key >= k.
+		Return (len(self._chunks), 0) if no such item exists."""
+		c = bisect_left(self._maxes, k)
+		if c == len(self._maxes):
+			return (c, 0)
+		return (c, bisect_left(self._chunks[c], k, key = _item_key))
+
+	def _item_at(self, c, i):
+		"""Return item at chunk c, offset i (or None if past the end)"""
+		if c < len(self._chunks):
+			return self._chunks[c][i]
+		return None
+
+	def _item_before(self, c, i):
+		"""Return item just before chunk c, offset i (or None if at the beginning)"""
+		if i > 0:
+			return self._chunks[c][i - 1]
+		if c > 0:
+			return self._chunks[c - 1][-1]
+		return None
+
+	def _split(self, c):
+		"""Cut chunk c in two if it holds more than 2*LOAD items"""
+		chunk = self._chunks[c]
+		if len(chunk) > 2 * self.LOAD:
+			half = chunk[self.LOAD:]
+			del chunk[self.LOAD:]
+			self._chunks.insert(c + 1, half)
+			if self._owned is not None:
+				self._owned.add(id(half))
+			self._maxes.insert(c, chunk[-1]._key)
+
+	def _remove_chunk(self, c):
+		"""Delete emptied chunk c and its index entry"""
+		del self._chunks[c]
+		del self._maxes[c]
+
+	def _items(self):
+		"""Generate items from min to max key"""
+		for chunk in self._chunks:
+			yield from chunk
+
+	def _writable_index(self):
+		"""Copy index lists (chunks and maxes) if a snapshot may share them"""
+		if self._shared:
+			self._chunks = list(self._chunks)
+			self._maxes = list(self._maxes)
+			self._owned = set() #Every current chunk may be shared
+			self._shared = False
+
+	def _writable_chunk(self, c):
+		"""Return chunk c, copying it first if a snapshot may share it"""
+		self._writable_index()
+		chunk = self._chunks[c]
+		if self._owned is not None and id(chunk) not in self._owned:
+			chunk = self._chunks[c] = list(chunk)
+			self._owned.add(id(chunk))
+		return chunk
+
+	#----------------------------------Public Methods-----------------------------------
+	def __init__(self):
+		"""Create empty map"""
+		self._build([])
+
+	def update_sorted(self, pairs):
+		"""Merge an iteration of (k, v) pairs sorted by key in O(n + m) time,
+		overwriting values of existing keys. Raise ValueError if pairs are not sorted."""
+		self._build(self._merge(list(self._items()), pairs))
+		self._owned = None #Fresh chunks: nothing is shared any more
+		self._shared = False
+
+	def __len__(self):
+		"""Return number of stored entries"""
+		return self._size
+
+	def __getitem__(self, k):
+		"""Return value associated with key k.
+		Raise KeyError if not found"""
+		item = self._item_at(*self._locate(k))
+		if item is None or item._key != k:
+			raise KeyError('Key Error ' + repr(k))
+		return item._value
+
+	def __setitem__(self, k, v):
+		"""Assign value v to key k; overwriting if k is already present in map"""
+		c, i = self._locate(k)
+		if c == len(self._chunks): #Greater than every key: append to last chunk
+			if c == 0:
+				self._writable_index()
+				self._chunks.append([])
+				self._maxes.append(k)
+			c -= 1
+			i = len(self._chunks[c])
+			self._writable_chunk(c)
+			self._maxes[c] = k
+		elif self._chunks[c][i]._key == k:
+			self._writable_chunk(c)[i] = self._Item(k, v) #Overwrite by replacing: item may be shared
+			return
+		chunk = self._writable_chunk(c)
+		chunk.insert(i, self._Item(k, v))
+		self._size += 1
+		self._split(c)
+
+	def __delitem__(self, k):
+		"""Delete item associated with key k.
+		Raise KeyError if not found."""
+		c, i = self._locate(k)
+		item = self._item_at(c, i)
+		if item is None or item._key != k:
+			raise KeyError('Key Error ' + repr(k))
+		chunk = self._writable_chunk(c)
+		chunk.pop(i)
+		self._size -= 1
+		if not chunk:
+			self._remove_chunk(c)
+		else:
+			self._maxes[c] = chunk[-1]._key
+			if len(chunk) < self.LOAD // 2 and c + 1 < len(self._chunks): #Absorb next chunk
+				chunk.extend(self._chunks[c + 1])
+				self._remove_chunk(c + 1)
+				self._maxes[c] = chunk[-1]._key
+				self._split(c)
+
+	def __iter__(self):
+		"""Iterate over keys stored in map (min to max)"""
+		for item in self._items():
+			yield item._key
+
+	def __reversed__(self):
+		"""Iterate over keys stored in map (max to min)"""
+		for chunk in reversed(self._chunks):
+			for item in reversed(chunk):
+				yield item._key
+
+	def find_min(self):
+		"""Return (key, value) tuple with minimun key (or None if empty)"""
+		if len(self) > 0:
+			item = self._chunks[0][0]
+			return (item._key, item._value)
+		else:
+			return None
+
+	def find_max(self):
+		"""Return (key, value) tuple with maximun key (or None if empty)"""
+		if len(self) > 0:
+			item = self._chunks[-1][-1]
+			return (item._key, item._value)
+		else:
+			return None
+
+	def find_ge(self, k):
+		"""Return (key, value) tuple with least key greater or equal than k"""
+		item = self._item_at(*self._locate(k))
+		if item is not None:
+			return (item._key, item._value)
+		else:
+			return None
+
+	def find_gt(self, k):
+		"""Return (key, value) tuple with least key strictly greater than k"""
+		c = bisect_right(self._maxes, k)
+		if c < len(self._chunks):
+			item = self._chunks[c][bisect_right(self._chunks[c], k, key = _item_key)]
+			return (item._key, item._value)
+		else:
+			return None
+
+	def find_lt(self, k):
+		"""Return (key, value) tuple with max key strictly smaller than k"""
+		item = self._item_before(*self._locate(k))
+		if item is not None:
+			return (item._key, item._value)
+		else:
+			return None
+
+	def find_range(self, start, stop):
+		"""Iterate all keys such that start <= key <= stop.
+		If start is None, begin from mininum key of map.
+		If stop is None, iterate until greatest key."""
+		c, i = (0, 0) if start is None else self._locate(start)
+		while c < len(self._chunks):
+			chunk = self._chunks[c]
+			while i < len(chunk):
+				item = chunk[i]
+				if stop is not None and not item._key < stop:
+					return
+				yield (item._key, item._value)
+				i += 1
+			c += 1
+			i = 0
+
+	#-----------------------------Order Statistics-------------------------------
+	#Ranks need the sizes of preceding chunks: O(log n + n/LOAD) per query
+	def _chunk_offset(self, c):
+		"""Return number of items stored in chunks before chunk c"""
+		return sum(len(chunk) for chunk in self._chunks[:c])
+
+	def _locate_rank(self, i):
+		"""Return (c, j) such that chunk c, offset j holds item of rank i (0 <= i < len)"""
+		c = 0
+		while i >= len(self._chunks[c]):
+			i -= len(self._chunks[c])
+			c += 1
+		return (c, i)
+
+	def rank(self, k):
+		"""Return number of keys strictly smaller than k"""
+		c, i = self._locate(k)
+		return self._chunk_offset(c) + i
+
+	def select(self, i):
+		"""Return (key, value) tuple of the item with rank i (negative i counts from the end).
+		Raise IndexError if i is out of range."""
+		if not -len(self) <= i < len(self):
+			raise IndexError('Rank out of range ' + repr(i))
+		c, j = self._locate_rank(i % len(self))
+		item = self._chunks[c][j]
+		return (item._key, item._value)
+
+	def items_range(self, i, j):
+		"""Iterate (key, value) tuples of items with rank in slice [i:j]"""
+		start, stop, step = slice(i, j).indices(len(self))
+		if start >= stop:
+			return
+		c, i = self._locate_rank(start)
+		for r in range(stop - start):
+			item = self._chunks[c][i]
+			yield (item._key, item._value)
+			i += 1
+			if i == len(self._chunks[c]):
+				c += 1
+				i = 0
+
+
+class SortedMultiMap(SortedTableMap):
+	"""Sorted table in which a key may have many values.
+	Every (k, v) pair is an item of its own; items with equal keys are adjacent, in
+	insertion order, so get_all() is one binary search followed by a scan.
+	As a Mapping, the multimap associates each distinct key with its first value:
+	len() and iteration count distinct keys, m[k] is the first value of k and
+	m[k] = v makes v the only value of k. pair_count(), pairs(), find_range()
+	and order statistics (rank, select, count_range) cover all pairs."""
+
+	#---------------------------------Nonpublic Methods---------------------------------
+	def _run(self, k):
+		"""Return (lo, hi) such that table[lo:hi] holds the items with key k"""
+		return (bisect_left(self._table, k, key = _item_key), bisect_right(self._table, k, key = _item_key))
+
+	def _build(self, items):
+		"""Replace contents with sorted list of items"""
+		self._table = items
+		self._count_keys()
+
+	def _count_keys(self):
+		"""Recount distinct keys of the table"""
+		table = self._table
+		self._keys = sum(1 for j in range(len(table)) if j == 0 or table[j]._key != table[j - 1]._key)
+
+	#----------------------------------Public Methods-----------------------------------
+	def update_sorted(self, pairs):
+		"""Add every pair of an iteration of (k, v) pairs sorted by key in O(n + m) time.
+		Raise ValueError if pairs are not sorted."""
+		new = [self._Item(k, v) for (k, v) in pairs]
+		for j in range(1, len(new)):
+			if new[j]._key < new[j - 1]._key:
+				raise ValueError('Input is not sorted by key')
+		self._table = list(merge(self._writable_table(), new, key = _item_key)) #Stable: old values first
+		self._count_keys()
+
+	def __init__(self):
+		"""Create empty multimap"""
+		super().__init__()
+		self._keys = 0 #Number of distinct keys
+
+	def __len__(self):
+		"""Return number of distinct keys"""
+		return self._keys
+
+	def pair_count(self):
+		"""Return number of (k, v) pairs"""
+		return len(self._table)
+
+	def add(self, k, v):
+		"""Add pair (k, v) after the values already associated with k"""
+		table = self._writable_table()
+		j = bisect_right(table, k, key = _item_key)
+		if j == 0 or table[j - 1]._key != k:
+			self._keys += 1 #First value of k
+		table.insert(j, self._Item(k, v))
+
+	def get_all(self, k):
+		"""Generate the values associated with key k in insertion order (none if k is absent)"""
+		table = self._table #A snapshot-triggered copy will not affect this scan
+		j = bisect_left(table, k, key = _item_key)
+		while j < len(table) and table[j]._key == k:
+			yield table[j]._value
+			j += 1
+
+	def remove_one(self, k, v):
+		"""Remove one occurrence of pair (k, v). Raise KeyError if there is none."""
+		lo, hi = self._run(k)
+		for j in range(lo, hi):
+			if self._table[j]._value == v:
+				self._writable_table().pop(j)
+				if hi - lo == 1:
+					self._keys -= 1 #Last value of k
+				return
+		raise KeyError('Key Error ' + repr((k, v)))
+
+	def remove_all(self, k):
+		"""Remove all values associated with key k; return their number"""
+		lo, hi = self._run(k)
+		if hi > lo:
+			del self._writable_table()[lo:hi]
+			self._keys -= 1
+		return hi - lo
+
+	def __setitem__(self, k, v):
+		"""Make v the only value associated with key k"""
+		lo, hi = self._run(k)
+		if hi == lo:
+			self._keys += 1
+		self._writable_table()[lo:hi] = [self._Item(k, v)]
+
+	def __delitem__(self, k):
+		"""Remove all values associated with key k (raise KeyError if there are none)"""
+		if not self.remove_all(k):
+			raise KeyError('Key Error ' + repr(k))
+
+	def __iter__(self):
+		"""Iterate over distinct keys (min to max)"""
+		table = self._table
+		for j in range(len(table)):
+			if j == 0 or table[j]._key != table[j - 1]._key:
+				yield table[j]._key
+
+	def __reversed__(self):
+		"""Iterate over distinct keys (max to min)"""
+		table = self._table
+		for j in range(len(table) - 1, -1, -1):
+			if j == 0 or table[j]._key != table[j - 1]._key:
+				yield table[j]._key
+
+	def __eq__(self, other):
+		"""Multimaps are equal if they associate the same values, in the same order, with the same keys"""
+		if not isinstance(other, (HashMultiMap, SortedMultiMap)):
+			return NotImplemented
+		return (len(self) == len(other) and self.pair_count() == other.pair_count() and
+				all(list(self.get_all(k)) == list(other.get_all(k)) for k in self))
+
+	def pairs(self):
+		"""Generate all (k, v) pairs (min to max key)"""
+		for item in self._table:
+			yield (item._key, item._value)
+
+	def count_range(self, start, stop):
+		"""Return number of pairs such that start <= key < stop (None bounds as in find_range)"""
+		low = 0 if start is None else self.rank(start)
+		high = self.pair_count() if stop is None else self.rank(stop)
+		return max(0, high - low)
+
+class SkipListMap(MapBase):
+	"""Sorted map implemented as a skip list (Pugh).
+	Each node carries a random number of forward links, so searches, insertions
+	and deletions take O(log n) expected time. Level 0 is a doubly linked list of
+	all items in key order, which range scans and iterations simply walk.
+	A mutation only rewires the links of the neighbours of one node, and a node's
+	forward links are set before it becomes reachable, so a reader walking the
+	links always observes a consistent sorted sequence."""
+
+	MAX_LEVEL = 32 #Enough for 2**32 items with p = 1/2
+
+	class _Node(MapBase._Item):
+		"""Skip list node: map item with forward links (one per level) and a backward link"""
+		__slots__ = '_next', '_prev'
+
+		def __init__(self, k, v, level):
+			super().__init__(k, v)
+			self._next = level * [None] #_next[i] is successor at level i
+			self._prev = None #Predecessor at level 0 (None for first node)
+
+	#---------------------------------Nonpublic Methods---------------------------------
+	def _random_level(self):
+		"""Return number of levels for a new node (geometric with p = 1/2)"""
+		level = 1
+		while level < self.MAX_LEVEL and random() < 0.5:
+			level += 1
+		return level
+
+	def _find_predecessors(self, k):
+		"""Return list whose i-th entry is the last node at level i with key < k
+		(the header if there is none)"""
+		update = self._level * [None]
+		node = self._header
+		for i in range(self._level - 1, -1, -1): #From top level down
+			nxt = node._next[i]
+			while nxt is not None and nxt._key < k:
+				node = nxt
+				nxt = node._next[i]
+			update[i] = node
+		return update
+
+	def _find_ge_node(self, k):
+		"""Return node with least key greater than or equal to k (or None)"""
+		node = self._header
+		for i in range(self._level - 1, -1, -1):
+			nxt = node._next[i]
+			while nxt is not None and nxt._key < k:
+				node = nxt
+				nxt = node._next[i]
+		return node._next[0]
+
+	def _last_node(self):
+		"""Return node with greatest key (or None if empty)"""
+		node = self._header
+		for i in range(self._level - 1, -1, -1):
+			while node._next[i] is not None:
+				node = node._next[i]
+		return node if node is not self._header else None
+
+	#----------------------------------Public Methods-----------------------------------
+	def __init__(self):
+		"""Create empty map"""
+		self._header = self._Node(None, None, self.MAX_LEVEL) #Sentinel preceding all nodes
+		self._level = 1 #Number of levels in use
+		self._n = 0
+
+	def __len__(self):
+		"""Return number of stored entries"""
+		return self._n
+
+	def __getitem__(self, k):
+		"""Return value associated with key k.
+		Raise KeyError if not found"""
+		node = self._find_ge_node(k)
+		if node is None or node._key != k:
+			raise KeyError('Key Error ' + repr(k))
+		return node._value
+
+	def __setitem__(self, k, v):
+		"""Assign value v to key k; overwriting if k is already present in map"""
+		update = self._find_predecessors(k)
+		nxt = update[0]._next[0]
+		if nxt is not None and nxt._key == k:
+			nxt._value = v #Overwrite
+			return
+		level = self._random_level()
+		if level > self._level: #Header precedes the new node at new levels
+			update.extend((level - self._level) * [self._header])
+			self._level = level
+		node = self._Node(k, v, level)
+		for i in range(level): #Links of new node first, then make it reachable
+			node._next[i] = update[i]._next[i]
+		node._prev = update[0] if update[0] is not self._header else None
+		if nxt is not None:
+			nxt._prev = node
+		for i in range(level):
+			update[i]._next[i] = node
+		self._n += 1
+
+	def __delitem__(self, k):
+		"""Delete item associated with key k.
+		Raise KeyError if not found."""
+		update = self._find_predecessors(k)
+		node = update[0]._next[0]
+		if node is None or node._key != k:
+			raise KeyError('Key Error ' + repr(k))
+		for i in range(len(node._next)): #Bypass node at each of its levels
+			update[i]._next[i] = node._next[i]
+		if node._next[0] is not None:
+			node._next[0]._prev = node._prev
+		while self._level > 1 and self._header._next[self._level - 1] is None:
+			self._level -= 1 #Drop emptied top levels
+		self._n -= 1
+
+	def __iter__(self):
+		"""Iterate over keys stored in map (min to max)"""
+		node = self._header._next[0]
+		while node is not None:
+			yield node._key
+			node = node._next[0]
+
+	def __reversed__(self):
+		"""Iterate over keys stored in map (max to min)"""
+		node = self._last_node()
+		while node is not None:
+			yield node._key
+			node = node._prev
+
+	def find_min(self):
+		"""Return (key, value) tuple with minimun key (or None if empty)"""
+		node = self._header._next[0]
+		if node is not None:
+			return (node._key, node._value)
+		else:
+			return None
+
+	def find_max(self):
+		"""Return (key, value) tuple with maximun key (or None if empty)"""
+		node = self._last_node()
+		if node is not None:
+			return (node._key, node._value)
+		else:
+			return None
+
+	def find_ge(self, k):
+		"""Return (key, value) tuple with least key greater or equal than k"""
+		node = self._find_ge_node(k)
+		if node is not None:
+			return (node._key, node._value)
+		else:
+			return None
+
+	def find_gt(self, k):
+		"""Return (key, value) tuple with least key strictly greater than k"""
+		node = self._find_ge_node(k)
+		if node is not None and node._key == k:
+			node = node._next[0] #Advance past match
+		if node is not None:
+			return (node._key, node._value)
+		else:
+			return None
+
+	def find_lt(self, k):
+		"""Return (key, value) tuple with max key strictly smaller than k"""
+		node = self._find_predecessors(k)[0]
+		if node is not self._header:
+			return (node._key, node._value)
+		else:
+			return None
+
+	def find_range(self, start, stop):
+		"""Iterate all keys such that start <= key < stop.
+		If start is None, begin from mininum key of map.
+		If stop is None, iterate until greatest key.
+		Walks level-0 links: O(log n) to locate start, then O(1) per item."""
+		node = self._header._next[0] if start is None else self._find_ge_node(start)
+		while node is not None and (stop is None or node._key < stop):
+			yield (node._key, node._value)
+			node = node._next[0]
+
 
 ###à######################## UNIT TEST ######################################
 if __name__ == "__main__":
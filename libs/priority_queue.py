@@ -30,7 +30,7 @@ class UnsortedPriorityQueue(PriorityQueueBase):
 			if trav.element() < small.element():
 				small = trav
 			trav = self._data.after(trav)
-		return trav
+		return small
 
 	def __init__(self):
 		"""Create an empty priority queue"""
@@ -89,52 +89,54 @@ class SortedPriorityQueue(PriorityQueueBase):
 
 
 class HeapPriorityQueue(PriorityQueueBase): #Recall _Item is defined in base class
-	"""A min-oriented priority queue implemented using a heap"""
+	"""A min-oriented priority queue implemented using a heap.
+	Upheap and downheap are iterative and move a hole instead of swapping: items on
+	the path shift by one level and the moving item is written once, at its final place."""
 	#--------------------------Nonpublic Methods-------------------------
 	def _parent(self, j):
 		return (j-1)//2
 
-	def _left(self, j):
-		return 2*j + 1
-
-	def _right(self, j);
-		return 2*j + 2
-
-	def _has_left(self, j):
-		return self._left(j) < len(self._data) #Is index before end of the array?
-
-	def _has_right(self, j):
-		return self._right(j) < len(self._data) #Is index before end of the array?
-
-	def _swap(self, i, j):
-		"""Swap items at positions i and j of the array"""
-		self._data[i], self._data[j] = self._data[j], self._data[i]
-
-	#looks smirnoff - to be corrected
 	def _upheap(self, j):
-		"""Recursive upheap to insert new elements. 
-		Swaps items until key order is restored"""
-		parent = self._parent(j)
-		if j > 0 and  self._data[j] < self._data[parent]:
-			self._swap(j, parent)
-			self._upheap(parent)
+		"""Move item at position j up until key order is restored"""
+		data = self._data #Local alias and inline index arithmetic keep the loop tight
+		item = data[j]
+		while j > 0:
+			parent = (j - 1) // 2
+			if not item < data[parent]:
+				break
+			data[j] = data[parent] #Parent moves down into the hole
+			j = parent
+		data[j] = item
 
 	def _downheap(self, j):
-		if self._has_left(j):
-			left = self._left(j)
-			small_child = left #Although right could be smaller
-			if self._has_right(j):
-				right = self._right(j)
-				if self._data[right] < self._data[left]:
-					small_child = right
-			if self._data[small_child] < self._data[j]:
-				self._swap(small_child, j)
-				self._downheap(small_child) #recur at position of smallest child
+		"""Move item at position j down until key order is restored"""
+		data = self._data
+		n = len(data)
+		item = data[j]
+		child = 2*j + 1
+		while child < n:
+			if child + 1 < n and data[child + 1] < data[child]:
+				child += 1 #Right child is smaller
+			if not data[child] < item:
+				break
+			data[j] = data[child] #Smallest child moves up into the hole
+			j = child
+			child = 2*j + 1
+		data[j] = item
+
+	def _heapify(self):
+		"""Bottom-up heap construction in O(n) time"""
+		for j in range(self._parent(len(self._data) - 1), -1, -1): #Start at parent of last leaf
+			self._downheap(j)
 
 	#----------------------------------Public Methods---------------------------------
-	def __init__(self):
-		"""Create empty priority queue"""
-		self._data = []
+	def __init__(self, contents = ()):
+		"""Create a new priority queue.
+		By default, queue will be empty. If contents is given, it should be an
+		iterable sequence of (k, v) tuples specifying the initial contents."""
+		self._data = [self._Item(k, v) for k, v in contents]
+		if len(self._data) > 1:
+			self._heapify()
 
 	def __len__(self):
 		"""Return number of items in priority queue"""
@@ -158,7 +160,498 @@ class HeapPriorityQueue(PriorityQueueBase): #Recall _Item is defined in base cla
 		Raise empty if queue is empty."""
 		if self.is_empty():
 			raise  Empty("Priority Queue is empty")
-		self._swap(0, len(data) - 1) #Put element at the end
-		item = self._data.pop() #remove it from array
-		self._downheap(0) #Fix new root
+		item = self._data[0]
+		last = self._data.pop() #remove last item from array
+		if self._data:
+			self._data[0] = last #Last item fills the root, then fix it
+			self._downheap(0)
+		return (item._key, item._value)
+
+	def pushpop(self, key, value):
+		"""Add a key-value pair, then return and remove tuple (k,v) with minimum key k.
+		Faster than add followed by remove_min: at most one downheap."""
+		if not self._data or not self._data[0]._key < key:
+			return (key, value) #New pair would be the minimum
+		item = self._data[0]
+		self._data[0] = self._Item(key, value)
+		self._downheap(0)
+		return (item._key, item._value)
+
+	def replace(self, key, value):
+		"""Return and remove tuple (k,v) with minimum key k, then add a key-value pair.
+		Faster than remove_min followed by add: one downheap.
+		Raise Empty if queue is empty."""
+		if self.is_empty():
+			raise  Empty("Priority Queue is empty")
+		item = self._data[0]
+		self._data[0] = self._Item(key, value)
+		self._downheap(0)
 		return (item._key, item._value)
+
+
+class AdaptableHeapPriorityQueue(HeapPriorityQueue):
+	"""A locator-based priority queue implemented with a binary heap.
+	add() returns a Locator, which tracks the current index of its item in the
+	array, so update() and remove() find the item in O(1) time and fix the heap
+	in O(log n) time."""
+
+	#-----------------------------Nested Locator class-----------------------------
+	class Locator(HeapPriorityQueue._Item):
+		"""Token for locating an entry of the priority queue"""
+		__slots__ = '_index' #Add index as additional field
+
+		def __init__(self, k, v, j = 0):
+			super().__init__(k, v)
+			self._index = j
+
+	_Item = Locator #Every item of the array is a Locator
+
+	#--------------------------Nonpublic Methods-------------------------
+	def _upheap(self, j):
+		"""Move item at position j up, keeping locator indices current"""
+		data = self._data
+		item = data[j]
+		while j > 0:
+			parent = (j - 1) // 2
+			if not item < data[parent]:
+				break
+			data[j] = data[parent]
+			data[j]._index = j
+			j = parent
+		data[j] = item
+		item._index = j
+
+	def _downheap(self, j):
+		"""Move item at position j down, keeping locator indices current"""
+		data = self._data
+		n = len(data)
+		item = data[j]
+		child = 2*j + 1
+		while child < n:
+			if child + 1 < n and data[child + 1] < data[child]:
+				child += 1
+			if not data[child] < item:
+				break
+			data[j] = data[child]
+			data[j]._index = j
+			j = child
+			child = 2*j + 1
+		data[j] = item
+		item._index = j
+
+	def _bubble(self, j):
+		"""Restore heap order around position j, whose key changed"""
+		if j > 0 and self._data[j] < self._data[self._parent(j)]:
+			self._upheap(j)
+		else:
+			self._downheap(j)
+
+	def _validate(self, loc):
+		"""Return index of Locator loc; raise ValueError if it is not in this queue"""
+		j = loc._index
+		if not (0 <= j < len(self) and self._data[j] is loc):
+			raise ValueError('Invalid locator')
+		return j
+
+	#----------------------------------Public Methods---------------------------------
+	def __init__(self, contents = ()):
+		"""Create a new priority queue, empty or holding the (k, v) tuples of contents"""
+		super().__init__(contents)
+		for j in range(len(self._data)): #Items that heapify did not move
+			self._data[j]._index = j
+
+	def add(self, key, value):
+		"""Add a key-value pair and return a Locator for it"""
+		token = self.Locator(key, value, len(self._data)) #Initialize Locator index
+		self._data.append(token)
+		self._upheap(len(self._data) - 1)
+		return token
+
+	def update(self, loc, newkey, newval):
+		"""Update key and value for the entry identified by Locator loc"""
+		j = self._validate(loc)
+		loc._key = newkey
+		loc._value = newval
+		self._bubble(j)
+
+	def remove(self, loc):
+		"""Remove and return the (k, v) pair identified by Locator loc"""
+		j = self._validate(loc)
+		last = self._data.pop()
+		if j < len(self._data): #loc was not last: last item fills its place
+			self._data[j] = last
+			last._index = j
+			self._bubble(j)
+		return (loc._key, loc._value)
+
+
+class _Owner:
+	"""Identifies the meldable queue holding a node. merge() forwards the owner of the
+	emptied queue to the owner of the receiving one, so no node is updated; find()
+	follows the forwards, compressing the path as in union-find."""
+	__slots__ = '_queue', '_next'
+
+	def __init__(self, queue):
+		self._queue = queue
+		self._next = None #Owner this one was forwarded to by a merge
+
+	def find(self):
+		"""Return the queue currently holding the nodes of this owner"""
+		root = self
+		while root._next is not None:
+			root = root._next
+		owner = self
+		while owner is not root: #Point the whole path at the root
+			nxt = owner._next
+			owner._next = root
+			owner = nxt
+		return root._queue
+
+	def forward(self, other):
+		"""Forward this owner to _Owner other"""
+		self._next = other
+		self._queue = None
+
+
+class PairingHeapPriorityQueue(PriorityQueueBase):
+	"""A min-oriented meldable priority queue implemented as a pairing heap.
+	The heap is a multiway tree in heap order; each node links to its leftmost child,
+	its next sibling and its previous node (left sibling, or parent for a leftmost child).
+	add, min, merge and decrease_key run in O(1) time, remove_min in O(log n) amortized
+	time. add returns the node of the new item, used as a locator by decrease_key."""
+
+	#-----------------------------Nested Locator class-----------------------------
+	class Locator(PriorityQueueBase._Item):
+		"""Tree node holding a key-value pair; token for locating it in the queue"""
+		__slots__ = '_child', '_sibling', '_prev', '_owner'
+
+		def __init__(self, k, v, owner):
+			super().__init__(k, v)
+			self._child = None #Leftmost child
+			self._sibling = None #Next sibling
+			self._prev = None #Left sibling, or parent of leftmost child
+			self._owner = owner #_Owner of the queue holding the node
+
+	#--------------------------Nonpublic Methods-------------------------
+	def _link(self, a, b):
+		"""Link roots a and b: the one with larger key becomes leftmost child of the other.
+		Return the new root."""
+		if b < a:
+			a, b = b, a
+		b._prev = a
+		b._sibling = a._child
+		if a._child is not None:
+			a._child._prev = b
+		a._child = b
+		return a
+
+	def _pair(self, first):
+		"""Meld the list of sibling trees starting at node first into one tree and return
+		its root (or None). Two passes: link pairs left to right, then fold right to left."""
+		roots = []
+		while first is not None:
+			a = first
+			b = a._sibling
+			first = b._sibling if b is not None else None
+			a._sibling = None
+			if b is not None:
+				b._sibling = None
+				a = self._link(a, b)
+			roots.append(a)
+		root = roots.pop() if roots else None
+		while roots:
+			root = self._link(roots.pop(), root)
+		if root is not None:
+			root._prev = None
+		return root
+
+	def _cut(self, node):
+		"""Detach subtree rooted at node (not the root) from its parent and siblings"""
+		prev = node._prev
+		if prev._child is node:
+			prev._child = node._sibling
+		else:
+			prev._sibling = node._sibling
+		if node._sibling is not None:
+			node._sibling._prev = prev
+		node._prev = node._sibling = None
+
+	#----------------------------------Public Methods---------------------------------
+	def __init__(self):
+		"""Create empty priority queue"""
+		self._root = None
+		self._size = 0
+		self._owner = _Owner(self)
+
+	def __len__(self):
+		"""Return number of items in priority queue"""
+		return self._size
+
+	def add(self, key, value):
+		"""Add a key-value pair and return a Locator for it"""
+		token = self.Locator(key, value, self._owner)
+		self._root = token if self._root is None else self._link(self._root, token)
+		self._size += 1
+		return token
+
+	def min(self):
+		"""Return but do not remove tuple (k,v) with minimum key k.
+		Raise Empty if queue is empty"""
+		if self.is_empty():
+			raise Empty("Priority Queue is empty")
+		return (self._root._key, self._root._value)
+
+	def remove_min(self):
+		"""Return and remove tuple (k,v) with minimum key k.
+		Raise Empty if queue is empty."""
+		if self.is_empty():
+			raise Empty("Priority Queue is empty")
+		root = self._root
+		self._root = self._pair(root._child)
+		root._child = root #Convention for a deprecated node
+		self._size -= 1
+		return (root._key, root._value)
+
+	def decrease_key(self, loc, newkey):
+		"""Lower the key of the item of Locator loc to newkey.
+		Raise ValueError if loc is not in this queue or newkey is larger than its key."""
+		if loc._child is loc or loc._owner.find() is not self:
+			raise ValueError('Invalid locator')
+		if loc._key < newkey:
+			raise ValueError('New key is larger than current key')
+		loc._key = newkey
+		if loc is not self._root:
+			self._cut(loc)
+			self._root = self._link(self._root, loc)
+
+	def merge(self, other):
+		"""Move all items of PairingHeapPriorityQueue other into this queue in O(1) time.
+		Other becomes empty; locators of its items stay valid in this queue."""
+		if not isinstance(other, PairingHeapPriorityQueue):
+			raise TypeError('Can only merge a PairingHeapPriorityQueue')
+		if other is self or other._root is None:
+			return
+		self._root = other._root if self._root is None else self._link(self._root, other._root)
+		self._size += other._size
+		other._owner.forward(self._owner) #Its nodes now belong here
+		other._owner = _Owner(other)
+		other._root = None
+		other._size = 0
+
+
+class BinomialHeapPriorityQueue(PriorityQueueBase):
+	"""A min-oriented meldable priority queue implemented as a binomial heap.
+	Trees are kept like the digits of a binary counter: self._trees[i] is a binomial
+	tree of order i (2**i items) or None. add increments the counter, in O(1)
+	amortized time, and merge adds two counters, in O(log n) time, linking trees of
+	equal order as carries. min and remove_min scan the O(log n) roots.
+	add returns a Locator: decrease_key moves items up their tree, so each Locator
+	points to its current node."""
+
+	#-----------------------------Nested classes-----------------------------
+	class Locator(PriorityQueueBase._Item):
+		"""Token for locating an item of the queue"""
+		__slots__ = '_node', '_owner'
+
+		def __init__(self, k, v, owner):
+			super().__init__(k, v)
+			self._node = None #Node currently holding this item
+			self._owner = owner #_Owner of the queue holding the item
+
+	class _Node:
+		"""Node of a binomial tree"""
+		__slots__ = '_item', '_parent', '_child', '_sibling', '_order'
+
+		def __init__(self, item):
+			self._item = item
+			item._node = self
+			self._parent = None
+			self._child = None #Child of highest order
+			self._sibling = None #Next child of the parent (next lower order)
+			self._order = 0
+
+	#--------------------------Nonpublic Methods-------------------------
+	def _link(self, a, b):
+		"""Link roots a and b of equal order: the one with larger key becomes first child
+		of the other. Return the new root."""
+		if b._item < a._item:
+			a, b = b, a
+		b._parent = a
+		b._sibling = a._child
+		a._child = b
+		a._order += 1
+		return a
+
+	def _add_trees(self, other):
+		"""Add list of trees other (other[i] of order i, or None) to self._trees,
+		as in binary addition"""
+		trees = self._trees
+		if len(trees) < len(other):
+			trees.extend([None] * (len(other) - len(trees)))
+		carry = None
+		for i in range(len(trees)):
+			b = other[i] if i < len(other) else None
+			if b is None and carry is None:
+				if i >= len(other):
+					break #Nothing left to add
+				continue
+			present = [t for t in (trees[i], b, carry) if t is not None]
+			if len(present) == 1:
+				trees[i], carry = present[0], None
+			elif len(present) == 2:
+				trees[i], carry = None, self._link(present[0], present[1])
+			else:
+				trees[i], carry = present[0], self._link(present[1], present[2])
+		if carry is not None:
+			trees.append(carry)
+
+	def _min_index(self):
+		"""Return index of the tree whose root has minimum key"""
+		if self.is_empty():
+			raise Empty("Priority Queue is empty")
+		best = None
+		for i in range(len(self._trees)):
+			t = self._trees[i]
+			if t is not None and (best is None or t._item < self._trees[best]._item):
+				best = i
+		return best
+
+	#----------------------------------Public Methods---------------------------------
+	def __init__(self):
+		"""Create empty priority queue"""
+		self._trees = []
+		self._size = 0
+		self._owner = _Owner(self)
+
+	def __len__(self):
+		"""Return number of items in priority queue"""
+		return self._size
+
+	def add(self, key, value):
+		"""Add a key-value pair and return a Locator for it"""
+		token = self.Locator(key, value, self._owner)
+		carry = self._Node(token)
+		trees = self._trees
+		i = 0
+		while i < len(trees) and trees[i] is not None: #Increment binary counter
+			carry = self._link(trees[i], carry)
+			trees[i] = None
+			i += 1
+		if i == len(trees):
+			trees.append(None)
+		trees[i] = carry
+		self._size += 1
+		return token
+
+	def min(self):
+		"""Return but do not remove tuple (k,v) with minimum key k.
+		Raise Empty if queue is empty"""
+		item = self._trees[self._min_index()]._item
+		return (item._key, item._value)
+
+	def remove_min(self):
+		"""Return and remove tuple (k,v) with minimum key k.
+		Raise Empty if queue is empty."""
+		i = self._min_index()
+		root = self._trees[i]
+		self._trees[i] = None
+		children = [None] * root._order #Children have orders root._order-1, ..., 0
+		child = root._child
+		while child is not None:
+			children[child._order] = child
+			child._parent = None
+			nxt = child._sibling
+			child._sibling = None
+			child = nxt
+		self._add_trees(children)
+		while self._trees and self._trees[-1] is None:
+			self._trees.pop()
+		self._size -= 1
+		item = root._item
+		item._node = None #Deprecated locator
+		return (item._key, item._value)
+
+	def decrease_key(self, loc, newkey):
+		"""Lower the key of the item of Locator loc to newkey.
+		Raise ValueError if loc is not in this queue or newkey is larger than its key."""
+		node = loc._node
+		if node is None or loc._owner.find() is not self:
+			raise ValueError('Invalid locator')
+		if loc._key < newkey:
+			raise ValueError('New key is larger than current key')
+		loc._key = newkey
+		while node._parent is not None and loc < node._parent._item: #Parent items move down
+			node._item = node._parent._item
+			node._item._node = node
+			node = node._parent
+		node._item = loc
+		loc._node = node
+
+	def merge(self, other):
+		"""Move all items of BinomialHeapPriorityQueue other into this queue in O(log n) time.
+		Other becomes empty; locators of its items stay valid in this queue."""
+		if not isinstance(other, BinomialHeapPriorityQueue):
+			raise TypeError('Can only merge a BinomialHeapPriorityQueue')
+		if other is self:
+			return
+		self._add_trees(other._trees)
+		self._size += other._size
+		other._owner.forward(self._owner) #Its items now belong here
+		other._owner = _Owner(other)
+		other._trees = []
+		other._size = 0
+
+
+class DaryHeapPriorityQueue(HeapPriorityQueue):
+	"""A min-oriented priority queue implemented using a d-ary heap.
+	Children of position j are d*j + 1, ..., d*j + d, so the heap has about
+	log_d(n) levels: upheap (add) does fewer steps as d grows, while each
+	downheap (remove_min) step compares up to d children.
+	With d = 2 it behaves as HeapPriorityQueue."""
+	#--------------------------Nonpublic Methods-------------------------
+	def _parent(self, j):
+		return (j-1)//self._d
+
+	def _upheap(self, j):
+		"""Move item at position j up until key order is restored"""
+		data = self._data
+		d = self._d
+		item = data[j]
+		while j > 0:
+			parent = (j - 1) // d
+			if not item < data[parent]:
+				break
+			data[j] = data[parent]
+			j = parent
+		data[j] = item
+
+	def _downheap(self, j):
+		"""Move item at position j down until key order is restored"""
+		data = self._data
+		d = self._d
+		n = len(data)
+		item = data[j]
+		first = d*j + 1
+		while first < n:
+			child = first
+			small = data[first]
+			for c in range(first + 1, min(first + d, n)): #Smallest of up to d children
+				if data[c] < small:
+					child = c
+					small = data[c]
+			if not small < item:
+				break
+			data[j] = small
+			j = child
+			first = d*j + 1
+		data[j] = item
+
+	#----------------------------------Public Methods---------------------------------
+	def __init__(self, contents = (), d = 4):
+		"""Create a new priority queue with arity d (2 or more).
+		By default, queue will be empty. If contents is given, it should be an
+		iterable sequence of (k, v) tuples specifying the initial contents."""
+		if d < 2:
+			raise ValueError('Arity must be at least 2')
+		self._d = d
+		super().__init__(contents)
@@ -0,0 +1,541 @@
+#Sorted maps implemented as (balanced) binary search trees
+from libs.tree import LinkedBinaryTree
+from libs.maps import MapBase
+
+class TreeMap(LinkedBinaryTree, MapBase):
+	"""Sorted map implementation using a binary search tree.
+	Subclasses plug in a balancing strategy by overriding the hooks
+	_rebalance_insert, _rebalance_delete and _rebalance_access.
+	Every node records the size of its subtree, to answer order statistics
+	(rank, select) in time proportional to the height of the tree."""
+
+	#---------------------------Nested _Node Class---------------------------
+	class _Node(LinkedBinaryTree._Node):
+		"""Node augmented with number of nodes in its subtree"""
+		__slots__ = '_count'
+
+		def __init__(self, element, parent = None, left = None, right = None):
+			super().__init__(element, parent, left, right)
+			self._count = 1 #New nodes are leaves
+
+	#---------------------------Override Position Class---------------------------
+	class Position(LinkedBinaryTree.Position):
+		def key(self):
+			"""Return key of map's key-value pair"""
+			return self.element()._key
+
+		def value(self):
+			"""Return value of map's key-value pair"""
+			return self.element()._value
+
+	#---------------------------------Nonpublic Methods---------------------------------
+	def _subtree_search(self, p, k):
+		"""Return Position of p's subtree having key k, or last node searched.
+		Iterative: splay trees may be arbitrarily deep."""
+		while True:
+			if k == p.key(): #Found match
+				return p
+			elif k < p.key(): #Search left subtree
+				if self.left(p) is None:
+					return p #Unsuccessful search
+				p = self.left(p)
+			else: #Search right subtree
+				if self.right(p) is None:
+					return p
+				p = self.right(p)
+
+	def _subtree_first_position(self, p):
+		"""Return Position of first item in subtree rooted at p"""
+		walk = p
+		while self.left(walk) is not None: #Keep walking left
+			walk = self.left(walk)
+		return walk
+
+	def _subtree_last_position(self, p):
+		"""Return Position of last item in subtree rooted at p"""
+		walk = p
+		while self.right(walk) is not None: #Keep walking right
+			walk = self.right(walk)
+		return walk
+
+	def _find_ge_position(self, k):
+		"""Return Position with least key greater than or equal to k (or None)"""
+		p = self.find_position(k)
+		if p is not None and p.key() < k:
+			p = self.after(p) #p's key is the greatest one below k
+		return p
+
+	def _subtree_count(self, node):
+		"""Return number of nodes in subtree rooted at node (0 if node is None)"""
+		return node._count if node is not None else 0
+
+	def _update_counts(self, node, delta):
+		"""Add delta to subtree sizes of node and all its ancestors"""
+		while node is not None:
+			node._count += delta
+			node = node._parent
+
+	def _select_node(self, i):
+		"""Return node of item with rank i (0 <= i < len)"""
+		node = self._root
+		while True:
+			left = self._subtree_count(node._left)
+			if i < left:
+				node = node._left
+			elif i == left:
+				return node
+			else:
+				i -= left + 1 #Skip left subtree and node itself
+				node = node._right
+
+	#-------------------------------Balancing Hooks------------------------------
+	def _rebalance_insert(self, p):
+		"""Called after a new Position p is added"""
+		pass
+
+	def _rebalance_delete(self, p):
+		"""Called with parent of deleted node (None if root was deleted)"""
+		pass
+
+	def _rebalance_access(self, p):
+		"""Called with last Position reached by a search or an overwrite"""
+		pass
+
+	#-----------------------------Restructuring Utilities---------------------------
+	def _relink(self, parent, child, make_left_child):
+		"""Relink parent node with child node (child may be None)"""
+		if make_left_child: #Make it a left child
+			parent._left = child
+		else: #Make it a right child
+			parent._right = child
+		if child is not None: #Make child point to parent
+			child._parent = parent
+
+	def _rotate(self, p):
+		"""Rotate Position p above its parent"""
+		x = p._node
+		y = x._parent #We assume this exists
+		z = y._parent #Grandparent (possibly None)
+		if z is None:
+			self._root = x #x becomes root
+			x._parent = None
+		else:
+			self._relink(z, x, y is z._left) #x becomes a direct child of z
+		#Now rotate x and y, including transfer of middle subtree
+		if x is y._left:
+			self._relink(y, x._right, True) #x._right becomes left child of y
+			self._relink(x, y, False) #y becomes right child of x
+		else:
+			self._relink(y, x._left, False) #x._left becomes right child of y
+			self._relink(x, y, True) #y becomes left child of x
+		#y is now child of x; x's subtree holds what y's held before
+		y._count = 1 + self._subtree_count(y._left) + self._subtree_count(y._right)
+		x._count = 1 + self._subtree_count(x._left) + self._subtree_count(x._right)
+
+	def _restructure(self, x):
+		"""Perform trinode restructure of Position x with parent/grandparent.
+		Return Position that becomes root of the restructured subtree."""
+		y = self.parent(x)
+		z = self.parent(y)
+		if (x == self.right(y)) == (y == self.right(z)): #Matching alignments
+			self._rotate(y) #Single rotation (of y)
+			return y #y is new subtree root
+		else: #Opposite alignments
+			self._rotate(x) #Double rotation (of x)
+			self._rotate(x)
+			return x #x is new subtree root
+
+	#----------------------------Public Navigation Methods--------------------------
+	def first(self):
+		"""Return the first Position in the tree (or None if empty)"""
+		return self._subtree_first_position(self.root()) if len(self) > 0 else None
+
+	def last(self):
+		"""Return the last Position in the tree (or None if empty)"""
+		return self._subtree_last_position(self.root()) if len(self) > 0 else None
+
+	def before(self, p):
+		"""Return the Position just before p in the natural order.
+		Return None if p is the first position."""
+		self._validate(p) #Inherited from LinkedBinaryTree
+		if self.left(p):
+			return self._subtree_last_position(self.left(p))
+		else: #Walk upward
+			walk = p
+			above = self.parent(walk)
+			while above is not None and walk == self.left(above):
+				walk = above
+				above = self.parent(walk)
+			return above
+
+	def after(self, p):
+		"""Return the Position just after p in the natural order.
+		Return None if p is the last position."""
+		self._validate(p)
+		if self.right(p):
+			return self._subtree_first_position(self.right(p))
+		else: #Walk upward
+			walk = p
+			above = self.parent(walk)
+			while above is not None and walk == self.right(above):
+				walk = above
+				above = self.parent(walk)
+			return above
+
+	def find_position(self, k):
+		"""Return position with key k, or else neighbor (or None if empty)"""
+		if self.is_empty():
+			return None
+		else:
+			p = self._subtree_search(self.root(), k)
+			self._rebalance_access(p) #Hook for balanced tree subclasses
+			return p
+
+	def delete(self, p):
+		"""Remove the item at given Position"""
+		self._validate(p)
+		if self.left(p) and self.right(p): #p has two children
+			replacement = self._subtree_last_position(self.left(p))
+			self._replace(p, replacement.element()) #From LinkedBinaryTree
+			p = replacement
+		#Now p has at most one child
+		parent = self.parent(p)
+		self._delete(p) #Inherited from LinkedBinaryTree
+		if parent is not None:
+			self._update_counts(parent._node, -1)
+		self._rebalance_delete(parent) #If root deleted, parent is None
+
+	#-------------------------------Public Map Methods-------------------------------
+	def __getitem__(self, k):
+		"""Return value associated with key k (raise KeyError if not found)"""
+		if self.is_empty():
+			raise KeyError('Key Error ' + repr(k))
+		else:
+			p = self._subtree_search(self.root(), k)
+			self._rebalance_access(p) #Hook for balanced tree subclasses
+			if k != p.key():
+				raise KeyError('Key Error ' + repr(k))
+			return p.value()
+
+	def __setitem__(self, k, v):
+		"""Assign value v to key k, overwriting existing value if present"""
+		if self.is_empty():
+			leaf = self._add_root(self._Item(k, v)) #From LinkedBinaryTree
+		else:
+			p = self._subtree_search(self.root(), k)
+			if p.key() == k:
+				p.element()._value = v #Replace existing item's value
+				self._rebalance_access(p) #Hook for balanced tree subclasses
+				return
+			else:
+				item = self._Item(k, v)
+				if p.key() < k:
+					leaf = self._add_right(p, item) #Inherited from LinkedBinaryTree
+				else:
+					leaf = self._add_left(p, item)
+				self._update_counts(p._node, 1)
+		self._rebalance_insert(leaf) #Hook for balanced tree subclasses
+
+	def __delitem__(self, k):
+		"""Remove item associated with key k (raise KeyError if not found)"""
+		if not self.is_empty():
+			p = self._subtree_search(self.root(), k)
+			if k == p.key():
+				self.delete(p) #Rely on positional version
+				return #Successful deletion complete
+			self._rebalance_access(p) #Hook for balanced tree subclasses
+		raise KeyError('Key Error ' + repr(k))
+
+	def __iter__(self):
+		"""Generate an iteration of all keys in the map in order"""
+		p = self.first()
+		while p is not None:
+			yield p.key()
+			p = self.after(p)
+
+	def __reversed__(self):
+		"""Generate an iteration of all keys in the map in reverse order"""
+		p = self.last()
+		while p is not None:
+			yield p.key()
+			p = self.before(p)
+
+	#------------------------------Public Sorted Map Methods-----------------------------
+	def find_min(self):
+		"""Return (key, value) tuple with minimum key (or None if empty)"""
+		if self.is_empty():
+			return None
+		else:
+			p = self.first()
+			return (p.key(), p.value())
+
+	def find_max(self):
+		"""Return (key, value) tuple with maximum key (or None if empty)"""
+		if self.is_empty():
+			return None
+		else:
+			p = self.last()
+			return (p.key(), p.value())
+
+	def find_ge(self, k):
+		"""Return (key, value) tuple with least key greater or equal than k"""
+		p = self._find_ge_position(k)
+		return (p.key(), p.value()) if p is not None else None
+
+	def find_gt(self, k):
+		"""Return (key, value) tuple with least key strictly greater than k"""
+		p = self._find_ge_position(k)
+		if p is not None and p.key() == k:
+			p = self.after(p) #Advance past match
+		return (p.key(), p.value()) if p is not None else None
+
+	def find_lt(self, k):
+		"""Return (key, value) tuple with max key strictly smaller than k"""
+		p = self.find_position(k)
+		if p is not None and not p.key() < k:
+			p = self.before(p)
+		return (p.key(), p.value()) if p is not None else None
+
+	def find_range(self, start, stop):
+		"""Iterate all keys such that start <= key < stop.
+		If start is None, begin from mininum key of map.
+		If stop is None, iterate until greatest key."""
+		if not self.is_empty():
+			if start is None:
+				p = self.first()
+			else:
+				p = self._find_ge_position(start)
+			while p is not None and (stop is None or p.key() < stop):
+				yield (p.key(), p.value())
+				p = self.after(p)
+
+
+	#-----------------------------Order Statistics-------------------------------
+	def rank(self, k):
+		"""Return number of keys strictly smaller than k"""
+		r = 0
+		node = self._root
+		last = None #Last node visited, for the access hook
+		while node is not None:
+			last = node
+			if node._element._key < k: #node and its left subtree precede k
+				r += self._subtree_count(node._left) + 1
+				node = node._right
+			else:
+				node = node._left
+		if last is not None:
+			self._rebalance_access(self._make_position(last))
+		return r
+
+	def select(self, i):
+		"""Return (key, value) tuple of the item with rank i (negative i counts from the end).
+		Raise IndexError if i is out of range."""
+		if not -len(self) <= i < len(self):
+			raise IndexError('Rank out of range ' + repr(i))
+		p = self._make_position(self._select_node(i % len(self)))
+		self._rebalance_access(p)
+		return (p.key(), p.value())
+
+	def count_range(self, start, stop):
+		"""Return number of keys such that start <= key < stop (None bounds as in find_range)"""
+		low = 0 if start is None else self.rank(start)
+		high = len(self) if stop is None else self.rank(stop)
+		return max(0, high - low)
+
+	def items_range(self, i, j):
+		"""Iterate (key, value) tuples of items with rank in slice [i:j]"""
+		start, stop, step = slice(i, j).indices(len(self))
+		if start < stop:
+			p = self._make_position(self._select_node(start))
+			for r in range(stop - start):
+				yield (p.key(), p.value())
+				p = self.after(p)
+
+class AVLTreeMap(TreeMap):
+	"""Sorted map implementation using an AVL tree"""
+
+	#---------------------------Nested _Node Class---------------------------
+	class _Node(TreeMap._Node):
+		"""Node class for AVL maintains height value for balancing"""
+		__slots__ = '_height' #Additional data member to store height
+
+		def __init__(self, element, parent = None, left = None, right = None):
+			super().__init__(element, parent, left, right)
+			self._height = 0 #Will be recomputed during balancing
+
+		def left_height(self):
+			return self._left._height if self._left is not None else 0
+
+		def right_height(self):
+			return self._right._height if self._right is not None else 0
+
+	#---------------------------Positional-based utility methods---------------------------
+	def _recompute_height(self, p):
+		p._node._height = 1 + max(p._node.left_height(), p._node.right_height())
+
+	def _isbalanced(self, p):
+		return abs(p._node.left_height() - p._node.right_height()) <= 1
+
+	def _tall_child(self, p, favorleft = False): #Parameter controls tiebreaker
+		if p._node.left_height() + (1 if favorleft else 0) > p._node.right_height():
+			return self.left(p)
+		else:
+			return self.right(p)
+
+	def _tall_grandchild(self, p):
+		child = self._tall_child(p)
+		#If child is on left, favor left grandchild; else favor right grandchild
+		alignment = (child == self.left(p))
+		return self._tall_child(child, alignment)
+
+	def _rebalance(self, p):
+		while p is not None:
+			old_height = p._node._height #Trivially 0 if new node
+			if not self._isbalanced(p): #Imbalance detected!
+				#Perform trinode restructuring, setting p to resulting root, and recompute new local heights after the restructuring
+				p = self._restructure(self._tall_grandchild(p))
+				self._recompute_height(self.left(p))
+				self._recompute_height(self.right(p))
+			self._recompute_height(p) #Adjust for recent changes
+			if p._node._height == old_height: #Has height changed?
+				p = None #No further changes needed
+			else:
+				p = self.parent(p) #Repeat with parent
+
+	#---------------------------Override balancing hooks---------------------------
+	def _rebalance_insert(self, p):
+		self._rebalance(p)
+
+	def _rebalance_delete(self, p):
+		self._rebalance(p)
+
+
+class SplayTreeMap(TreeMap):
+	"""Sorted map implementation using a splay tree.
+	Bounds are amortized: a single operation may take O(n) time."""
+
+	#---------------------------------Splay Operation-----------------------------------
+	def _splay(self, p):
+		while p != self.root():
+			parent = self.parent(p)
+			grand = self.parent(parent)
+			if grand is None: #zig case
+				self._rotate(p)
+			elif (parent == self.left(grand)) == (p == self.left(parent)): #zig-zig case
+				self._rotate(parent) #Move parent up
+				self._rotate(p) #Then move p up
+			else: #zig-zag case
+				self._rotate(p) #Move p up
+				self._rotate(p) #Move p up again
+
+	#---------------------------Override balancing hooks---------------------------
+	def _rebalance_insert(self, p):
+		self._splay(p)
+
+	def _rebalance_delete(self, p):
+		if p is not None:
+			self._splay(p)
+
+	def _rebalance_access(self, p):
+		self._splay(p)
+
+
+class RedBlackTreeMap(TreeMap):
+	"""Sorted map implementation using a red-black tree"""
+
+	#---------------------------Nested _Node Class---------------------------
+	class _Node(TreeMap._Node):
+		"""Node class for red-black tree maintains bit that denotes color"""
+		__slots__ = '_red' #Add additional data member to the Node class
+
+		def __init__(self, element, parent = None, left = None, right = None):
+			super().__init__(element, parent, left, right)
+			self._red = True #New node red by default
+
+	#---------------------------Positional-based utility methods---------------------------
+	#We consider a nonexistent child to be trivially black
+	def _set_red(self, p):
+		p._node._red = True
+
+	def _set_black(self, p):
+		p._node._red = False
+
+	def _set_color(self, p, make_red):
+		p._node._red = make_red
+
+	def _is_red(self, p):
+		return p is not None and p._node._red
+
+	def _is_red_leaf(self, p):
+		return self._is_red(p) and self.is_leaf(p)
+
+	def _get_red_child(self, p):
+		"""Return a red child of p (or None if no such child)"""
+		for child in (self.left(p), self.right(p)):
+			if self._is_red(child):
+				return child
+		return None
+
+	#-----------------------------Support for insertions-----------------------------
+	def _rebalance_insert(self, p):
+		self._resolve_red(p) #New node is always red
+
+	def _resolve_red(self, p):
+		if self.is_root(p):
+			self._set_black(p) #Make root black
+		else:
+			parent = self.parent(p)
+			if self._is_red(parent): #Double red problem
+				uncle = self.sibling(parent)
+				if not self._is_red(uncle): #Case 1: misshapen 4-node
+					middle = self._restructure(p) #Do trinode restructuring
+					self._set_black(middle) #And then fix colors
+					self._set_red(self.left(middle))
+					self._set_red(self.right(middle))
+				else: #Case 2: overfull 5-node
+					grand = self.parent(parent)
+					self._set_red(grand) #Grandparent becomes red
+					self._set_black(self.left(grand)) #Its children become black
+					self._set_black(self.right(grand))
+					self._resolve_red(grand) #Recur at red grandparent
+
+	#-----------------------------Support for deletions-----------------------------
+	def _rebalance_delete(self, p):
+		if len(self) == 1:
+			self._set_black(self.root()) #Special case: ensure that root is black
+		elif p is not None:
+			n = self.num_children(p)
+			if n == 1: #Deficit exists unless child is a red leaf
+				c = next(self.children(p))
+				if not self._is_red_leaf(c):
+					self._fix_deficit(p, c)
+			elif n == 2: #Removed black node with red child
+				if self._is_red_leaf(self.left(p)):
+					self._set_black(self.left(p))
+				else:
+					self._set_black(self.right(p))
+
+	def _fix_deficit(self, z, y):
+		"""Resolve black deficit at z, where y is the root of z's heavier subtree"""
+		if not self._is_red(y): #y is black; will apply Case 1 or 2
+			x = self._get_red_child(y)
+			if x is not None: #Case 1: y is black and has red child x; do "transfer"
+				old_color = self._is_red(z)
+				middle = self._restructure(x)
+				self._set_color(middle, old_color) #Middle gets old color of z
+				self._set_black(self.left(middle)) #Children become black
+				self._set_black(self.right(middle))
+			else: #Case 2: y is black, but no red children; recolor as "fusion"
+				self._set_red(y)
+				if self._is_red(z):
+					self._set_black(z) #This resolves the problem
+				elif not self.is_root(z):
+					self._fix_deficit(self.parent(z), self.sibling(z)) #Recur upward
+		else: #Case 3: y is red; rotate misaligned 3-node and repeat
+			self._rotate(y)
+			self._set_black(y)
+			self._set_red(z)
+			if z == self.right(y):
+				self._fix_deficit(z, self.left(z))
+			else:
+				self._fix_deficit(z, self.right(z))
@@ -240,17 +240,17 @@ class LinkedBinaryTree(BinaryTree):
 	def parent(self, p):
 		"""Return Position representing p's parent"""
 		node = self._validate(p)
-		return self._make_position(self, node._parent)
+		return self._make_position(node._parent)
 
 	def left(self, p):
 		"""Return a Position representing p's left child (or None)"""
 		node = self._validate(p)
-		return self._make_position(self, node._left)
+		return self._make_position(node._left)
 
 	def right(self, p):
 		"""Return a Position representing p's right child (or None)"""
 		node = self._validate(p)
-		return self._make_position(self, node._right)
+		return self._make_position(node._right)
 
 	def num_children(self, p):
 		"""Return number of children of Position p"""
@@ -282,6 +282,7 @@ class LinkedBinaryTree(BinaryTree):
 		if node._left is not  None:
 			raise ValueError("This node already has a left child")
 		else:
+			self._size += 1
 			node._left = self._Node(e, node) #node is its parent
 			return self._make_position(node._left)
 
@@ -294,6 +295,7 @@ class LinkedBinaryTree(BinaryTree):
 		if node._right is not  None:
 			raise ValueError("This node already has a right child")
 		else:
+			self._size += 1
 			node._right = self._Node(e, node) #node is its parent
 			return self._make_position(node._right)
 
@@ -313,16 +315,17 @@ class LinkedBinaryTree(BinaryTree):
 		if self.num_children(p) == 2:
 			raise  ValueError("Node at this position has two children")
 		child = node._left if node._left else node._right #Might be None
+		if child is not None:
+			child._parent = node._parent #Child's grandparent becomes parent
 		if self._root is node:
 			self._root = child #Child becomes new root
-			child._parent = None 
 		else:
 			parent = node._parent
 			if node is parent._left:
 				parent._left = child
 			else:
 				parent._right = child
-		self.size -= 1 #Decrease tree size
+		self._size -= 1 #Decrease tree size
 		node._parent = node #Deprecate old node; convention
 		return node._element
 
@@ -337,8 +340,8 @@ class LinkedBinaryTree(BinaryTree):
 		if not T_1.is_empty(): #Attach T_1 as left subtree
 			T_1._root._parent = node
 			node._left = T_1._root
-			T_1.root = None #Deprecate tree
-			T_1.size = 0 #Deprecate tree
+			T_1._root = None #Deprecate tree
+			T_1._size = 0 #Deprecate tree
 		if not T_2.is_empty(): #Attach T_2 as right subtree
 			T_2._root._parent = node
 			node._right = T_2._root